@@ -4,8 +4,9 @@ import os
 import threading
 import time
 import webview
-from bottle import run as bottle_run
+import desktop_export
 from backend.main import app
+from backend.serve import serve
 import clr
 
 # 1. Determine Paths (Handles "Frozen" state for PyInstaller)
@@ -60,10 +61,18 @@ class JSApi:
                     return False
         return False
 
+    def export_rfis(self, body, filename, session_id=None):
+        export_dir = os.path.join(os.path.expanduser("~/Documents"), "CA_Manager_Exports")
+        try:
+            os.makedirs(export_dir, exist_ok=True)
+        except OSError:
+            export_dir = ''
+        return desktop_export.export_rfis(webview.windows[0], body, filename, session_id, directory=export_dir)
+
 # 3. Threaded Backend Function
 def start_backend():
-    # Run Bottle on localhost
-    bottle_run(app, host="localhost", port=8000, quiet=True)
+    # Run the app under waitress on localhost, so one slow ACC call does not block the UI
+    serve(app, host="localhost", port=8000, workers=1)
 
 def run():
     # Start Backend in a separate thread (Daemon so it dies when app closes)
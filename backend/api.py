@@ -1,6 +1,12 @@
 from backend.platforms.acc.client import Client
-from backend.platforms.acc.rfis import search_rfis
-import pandas as pd
+from backend.platforms.acc.rfis import (
+    DETAIL_ONLY_FIELDS,
+    HydrationResult,
+    hydrate_rfis,
+    iter_activity_pages,
+    iter_rfi_pages,
+    search_projection,
+)
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
@@ -9,9 +15,25 @@ import os
 import logging
 import json
 from backend import token_store
+from backend.coalesce import request_key
+from backend.profiling import phase, timed_iter
+from backend.export import write_xlsx
+from backend.platforms.acc.downloads import download_rfi_attachments
+from backend.platforms.acc.sync import rfi_sync
 
 logger = logging.getLogger(__name__)
 
+# Serve /api/rfis table loads from the incrementally synced RFI set
+RFI_SYNC = os.getenv("RFI_SYNC_ENABLED", "1") != "0"
+INCREMENTS_CONFIG_KEY = "increments"
+
+def field_config_key(session_id):
+    return f"config:fields:{session_id}"
+
+def config_keys(session_id):
+    "token_store config keys a session's requests read; fetched together with its tokens per request"
+    return [field_config_key(session_id), INCREMENTS_CONFIG_KEY]
+
 def load_env():
     if getattr(sys, 'frozen', False):
         # Running inside PyInstaller
@@ -28,8 +50,8 @@ load_env()
 
 class API:
         
-    def __init__(self):
-        self.client = Client()
+    def __init__(self, session_id=None, http=None):
+        self.client = Client(session_id=session_id, http=http)
 
     def login(self, session_id: str):
         try:
@@ -38,47 +60,132 @@ class API:
             logger.error(f"[login] Login failed with error: {e}")
             raise
 
-    def get_rfis(self, filters):
+    def _ensure_user(self):
+        self.client.ensure_user()
+
+    def _iter_pages(self, filters, fields=None):
+        """
+        Yield pages of search rows for the table filters, following
+        pagination so nothing past the first page is dropped.
+        """
         search_text = filters.get("searchText", " ")
         activity_after = filters.get("updatedAfter", None)
         limit = filters.get("limit", 200)
         
-        if not self.client.user_id:
-            self.client.user_id = [self.client.get_user_id()]
+        self._ensure_user()
 
         if activity_after:
-            # 1. Search by createdAt >= PT time (converted to UTC)
-            created_ids = search_rfis(
+            # Search by createdAt/updatedAt >= PT time (converted to UTC)
+            yield from iter_activity_pages(
                 self.client,
                 search_text=search_text,
-                created_after=activity_after,
-                updated_after=None,
-                limit=limit
+                activity_after=activity_after,
+                limit=limit,
+                fields=fields
             )
+            return
 
-            # 2. Search by updatedAt >= PT time (converted to UTC)
-            updated_ids = search_rfis(
-                self.client,
-                search_text=search_text,
-                created_after=None,
-                updated_after=activity_after,
-                limit=limit
-            )
-            # Merge both by RFI ID
-            search_ids = list(set(created_ids) | set(updated_ids))
-            
-        else:
-            # No date provided → default search
-            search_ids = search_rfis(
-                self.client,
-                search_text=search_text,
-                created_after=None,
-                updated_after=None,
-                limit=limit
-            )
-        print("Search IDs:", search_ids)
+        # No date provided → default search
+        yield from iter_rfi_pages(
+            self.client,
+            search_text=search_text,
+            created_after=None,
+            updated_after=None,
+            limit=limit,
+            fields=fields
+        )
+
+    def iter_rfis(self, filters):
+        "Stream matching RFI IDs page by page"
+        for page in self._iter_pages(filters):
+            for row in page:
+                yield row.get("id")
+
+    def get_rfi_versions(self, filters):
+        "Map matching RFI IDs to their updatedAt, in search order"
+        versions = {}
+        for page in self._iter_pages(filters, fields=["id", "updatedAt"]):
+            for row in page:
+                versions[row.get("id")] = row.get("updatedAt")
+        return versions
+
+    def get_rfis(self, filters, stream=False):
+        if stream:
+            return self.iter_rfis(filters)
+        search_ids = list(self.iter_rfis(filters))
+        logger.debug(f"[get_rfis] {len(search_ids)} RFIs matched")
         return search_ids
 
+    def custom_field_keys(self):
+        return {
+            group["key"]
+            for group in self.client.get_rfi_attributes()
+            if group.get("category") == "customAttributes"
+        }
+
+    def _table_pages(self, filters, projection, synced=False):
+        "Pages of projected rows, from the synced RFI set or straight from search"
+        if not synced:
+            yield from self._iter_pages(filters, fields=projection)
+            return
+        self._ensure_user()
+        yield from rfi_sync.pages(self.client, filters, projection)
+
+    def iter_table_rows(self, filters, desired_fields, transform=None, failures=None, synced=False):
+        """
+        Stream table rows built from the search:rfis projection, one page in
+        memory at a time. Only fields the search endpoint cannot return are
+        fetched with a GET per RFI. Rows that fail are recorded in `failures`.
+        With `synced`, rows come from the materialized set in rfi_sync, which
+        holds the whole scope; streaming callers (exports) leave it off.
+        """
+        failures = {} if failures is None else failures
+        projection = search_projection(desired_fields, self.custom_field_keys())
+        detail_fields = [f for f in desired_fields if f in DETAIL_ONLY_FIELDS]
+
+        for page in timed_iter(self._table_pages(filters, projection, synced), "search"):
+            if detail_fields:
+                versions = {row.get("id"): row.get("updatedAt") for row in page}
+                with phase("hydrate"):
+                    hydrated = hydrate_rfis(self.client, list(versions), versions=versions)
+                failures.update(hydrated.failures)
+                details = {rfi.get("id"): rfi for rfi in hydrated.items}
+                page = [row for row in page if row.get("id") in details]
+                for row in page:
+                    rfi = details[row.get("id")]
+                    for key in detail_fields:
+                        row[key] = rfi.get(key)
+
+            for row in page:
+                if transform:
+                    try:
+                        with phase("flatten"):
+                            row = transform(row)
+                    except Exception as e:
+                        failures[row.get("id")] = str(e) or e.__class__.__name__
+                        continue
+                yield row
+
+    def rfi_query_key(self, filters, desired_fields):
+        """
+        Key for a table load: the same project, user, search text, activity
+        filter, page size and fields give the same rows, whichever session asks.
+        """
+        self._ensure_user()
+        return request_key(
+            self.client.project_id,
+            self.client.user_id,
+            filters.get("searchText", " "),
+            filters.get("updatedAfter"),
+            filters.get("limit", 200),
+            sorted(desired_fields),
+        )
+
+    def get_rfi_rows(self, filters, desired_fields, transform=None):
+        result = HydrationResult()
+        result.items = list(self.iter_table_rows(filters, desired_fields, transform, result.failures, synced=RFI_SYNC))
+        return result
+
 
     def get_rfi_attributes(self):
         try:
@@ -88,18 +195,20 @@ class API:
             logger.error(f"[get_rfi_attributes] Failed: {e}")
             raise
 
+    def _read_config(self, key, default):
+        "One saved config, decoded; every config key of the session is read in the same round-trip"
+        stored = token_store.get_configs(config_keys(self.client.session_id)).get(key)
+        if stored:
+            try:
+                return json.loads(stored)
+            except json.JSONDecodeError:
+                return default
+        return default
+
     def get_increment_configs(self):
         """Get all increment configurations"""
         try:
-            config_key = f"increments"
-            stored = token_store.get_config(config_key)
-            
-            if stored:
-                try:
-                    return json.loads(stored)
-                except json.JSONDecodeError:
-                    return {"configs": {}}
-            return {"configs": {}}
+            return self._read_config(INCREMENTS_CONFIG_KEY, {"configs": {}})
         except Exception as e:
             logger.error(f"[get_increment_configs] Failed: {e}")
             return {"configs": {}}
@@ -108,7 +217,7 @@ class API:
         """Get configuration for a specific increment"""
         try:
             all_configs = self.get_increment_configs()
-            print("Getting increment config:", all_configs)
+            logger.debug(f"[get_increment_config] {len(all_configs.get('configs', {}))} increments configured")
             return all_configs.get("configs", {}).get(increment, None)
         except Exception as e:
             logger.error(f"[get_increment_config] Failed: {e}")
@@ -117,9 +226,8 @@ class API:
     def save_increment_configs(self, configs):
         """Save all increment configurations"""
         try:
-            config_key = f"increments"
-            print("Saving increment configs:", configs)
-            token_store.set_config(config_key, json.dumps(configs))
+            logger.debug(f"[save_increment_configs] Saving {len(configs)} increments")
+            token_store.set_config(INCREMENTS_CONFIG_KEY, json.dumps(configs))
             return {"status": "success"}
         except Exception as e:
             logger.error(f"[save_increment_configs] Failed: {e}")
@@ -127,30 +235,30 @@ class API:
 
     def get_field_config(self):
         try:
-            config_key = f"config:fields:{self.client.session_id}"
-            stored = token_store.get_config(config_key)
+            return self._read_config(field_config_key(self.client.session_id), {"fields": []})
         except Exception as e:
             logger.error(f"[get_field_config] Failed: {e}")
             return {"fields": []}
-        if stored:
-            try:
-                return json.loads(stored)
-            except json.JSONDecodeError:
-                return {"fields": []}
-        return {"fields": []}
 
     def save_field_config(self, config):
         try:
-            config_key = f"config:fields:{self.client.session_id}"
-            token_store.set_config(config_key, json.dumps(config))
+            token_store.set_config(field_config_key(self.client.session_id), json.dumps(config))
         except Exception as e:
             logger.error(f"[save_field_config] Failed: {e}")
             raise
 
+    def get_signed_download_url(self, storage_urn):
+        return self.client.get_signed_download(storage_urn)
+
+    def download_attachments(self, filters, base_folder, progress=None):
+        "Download every attachment of the RFIs matching the table filters into base_folder"
+        rfis = list(self.iter_table_rows(filters, ["id", "customIdentifier"]))
+        return download_rfi_attachments(self.client, rfis, base_folder, progress=progress)
+
     def get_rfi_url(self, rfi_id):
         return f"https://acc.autodesk.com/docs/rfi/{rfi_id}"
 
     def export_excel(self, rows, path):
-        df = pd.DataFrame(rows)
-        df.to_excel(path, index=False)
+        fields = list(dict.fromkeys(key for row in rows for key in row))
+        write_xlsx(rows, fields, fields, path)
         return {"saved": path}
@@ -0,0 +1,250 @@
+"""
+ASGI variant of the backend on FastAPI. Table loads, attributes, config and
+signed downloads are served by coroutines on one event loop, with ACC calls
+made through an async HTTP/2-capable pool instead of a thread per request.
+
+    python -m backend.asgi
+    uvicorn backend.asgi:app --workers 2
+"""
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+import httpx
+import requests
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+
+from backend import metrics, token_store
+from backend.api import API, config_keys
+from backend.coalesce import AsyncSingleFlight
+from backend.field_config import custom_decoder, field_list
+from backend.platforms.acc.async_client import AsyncClient, build_async_http
+from backend.platforms.acc.async_rfis import table_rows
+from backend.platforms.acc.client import build_http_session
+from backend.redis_client import redis_client
+from backend.rfi_cache import rfi_cache
+from backend.serve import SERVE_HOST, SERVE_PORT, SERVE_WORKERS, SHUTDOWN_TIMEOUT, ready, worker_count
+from backend.sessions import SessionRegistry
+
+logger = logging.getLogger(__name__)
+
+BASE_FIELDS = ["id", "customIdentifier", "title", "status"]
+
+
+class AsyncSession:
+    """
+    Per-session state for the ASGI app: the synchronous API keeps tokens and
+    saved configuration, and an AsyncClient on top of its Client makes the
+    ACC calls.
+    """
+
+    def __init__(self, session_id: str, http: requests.Session, async_http: httpx.AsyncClient):
+        self.api = API(session_id=session_id, http=http)
+        self.client = AsyncClient(self.api.client, async_http)
+
+
+class _Pools:
+    http: Optional[requests.Session] = None
+    async_http: Optional[httpx.AsyncClient] = None
+
+
+pools = _Pools()
+
+
+def _create_session(session_id: str) -> AsyncSession:
+    if pools.http is None:
+        pools.http = build_http_session()
+    if pools.async_http is None:
+        pools.async_http = build_async_http()
+    return AsyncSession(session_id, pools.http, pools.async_http)
+
+
+sessions = SessionRegistry(factory=_create_session)
+rfi_queries = AsyncSingleFlight()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    custom_decoder.compile()
+    ready.set()
+    try:
+        yield
+    finally:
+        ready.clear()
+        if pools.async_http is not None:
+            await pools.async_http.aclose()
+            pools.async_http = None
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origin_regex=".*",
+    allow_credentials=True,
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["Origin", "Content-Type", "Accept", "X-Session-Id"],
+)
+
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        rule = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.http_request_seconds.observe(time.perf_counter() - start, request.method, rule)
+        metrics.http_responses.inc(request.method, rule, str(status))
+
+
+@app.middleware("http")
+async def prefetch_session(request: Request, call_next):
+    "One Redis round-trip for the request's tokens and configs; threadpool handlers inherit the context"
+    session_id = request.headers.get("X-Session-Id") or "global"
+    with token_store.prefetch(session_id, config_keys(session_id)):
+        return await call_next(request)
+
+
+@app.exception_handler(Exception)
+async def error500(request: Request, exc: Exception):
+    logger.exception(f"[asgi] {request.method} {request.url.path} failed")
+    return JSONResponse({"error": str(exc)}, status_code=500)
+
+
+def _session(request: Request) -> AsyncSession:
+    return sessions.get(request.headers.get("X-Session-Id") or "global")
+
+
+async def _body(request: Request) -> Dict[str, Any]:
+    raw = await request.body()
+    return json.loads(raw) if raw else {}
+
+
+@app.get("/api/auth/status")
+def auth_status(request: Request):
+    tokens = _session(request).api.client.load_tokens()
+    return {"logged_in": bool(tokens)}
+
+
+@app.post("/api/rfis")
+async def get_rfis(request: Request):
+    session = _session(request)
+    filters = await _body(request)
+    desired_fields = list(set((filters.get("fields") or []) + BASE_FIELDS))
+    custom_fields = {g["key"] for g in field_list.groups if g.get("category") == "customAttributes"}
+
+    # The user id is part of the key; resolve it here so building the key never blocks
+    await session.client.ensure_user()
+    key = session.api.rfi_query_key(filters, desired_fields)
+    hydrated, _ = await rfi_queries.do(
+        key, lambda: table_rows(session.client, filters, desired_fields, custom_fields, transform=custom_decoder.decode)
+    )
+    rows = [{key: rfi.get(key) for key in desired_fields} for rfi in hydrated.items]
+    return {"items": rows, "failed": hydrated.failed}
+
+
+@app.get("/api/rfis/attributes")
+def get_rfi_attributes(request: Request):
+    body, etag = field_list.attributes_payload()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/metrics")
+def get_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/api/rfis/cache")
+def get_rfi_cache_stats():
+    return {**rfi_cache.stats(), "queries": rfi_queries.stats()}
+
+
+@app.post("/api/acc/signed-download")
+async def signed_download(request: Request):
+    session = _session(request)
+    body = await _body(request)
+    storage_urn = (body.get("storageUrn") or "").strip()
+    if not storage_urn:
+        return JSONResponse({"error": "storageUrn is required"}, status_code=400)
+    try:
+        url = await session.client.get_signed_download(storage_urn)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return {"url": url}
+
+
+# Config routes only touch Redis; plain `def` handlers run in the threadpool
+@app.get("/api/config/fields")
+def get_field_config(request: Request):
+    try:
+        return _session(request).api.get_field_config()
+    except Exception as e:
+        logger.error(f"[get_field_config] Failed: {e}")
+        return {"fields": []}
+
+
+@app.post("/api/config/fields")
+def save_field_config(request: Request, config: Dict[str, Any]):
+    try:
+        _session(request).api.save_field_config(config)
+    except Exception as e:
+        logger.error(f"[save_field_config] Failed: {e}")
+        return {"status": "failed"}
+    return {"status": "saved"}
+
+
+@app.get("/api/config/increments")
+def get_increment_configs(request: Request):
+    try:
+        return _session(request).api.get_increment_configs()
+    except Exception as e:
+        logger.error(f"Failed to get increment configs: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.post("/api/config/increments")
+def save_increment_configs(request: Request, body: Dict[str, Any]):
+    try:
+        return _session(request).api.save_increment_configs(body.get("configs", {}))
+    except Exception as e:
+        logger.error(f"Failed to save increment configs: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.get("/api/ready")
+def readiness():
+    checks = {"serving": ready.is_set(), "redis": True}
+    try:
+        redis_client.ping()
+    except Exception as e:
+        logger.warning(f"[readiness] Redis ping failed: {e}")
+        checks["redis"] = False
+    status = 200 if all(checks.values()) else 503
+    return JSONResponse({"ready": all(checks.values()), "checks": checks}, status_code=status)
+
+
+def main():
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO)
+    uvicorn.run(
+        "backend.asgi:app",
+        host=SERVE_HOST,
+        port=SERVE_PORT,
+        workers=worker_count(SERVE_WORKERS),
+        timeout_graceful_shutdown=int(SHUTDOWN_TIMEOUT),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Concurrent table loads against one process: the Bottle app under waitress
+threads vs. the FastAPI app on one event loop, both backed by the stub ACC server.
+
+    python -m backend.bench.asgi --concurrency 50 200 --latency 0.05
+"""
+import argparse
+import asyncio
+import logging
+import socket
+import threading
+import time
+
+from backend.bench.stub_acc import StubACC, _stub_env, point_at_stub
+
+CONCURRENCY = (50, 200)
+BODY = {"searchText": " ", "limit": 50, "fields": ["id", "customIdentifier", "title", "status"]}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _load(url: str, concurrency: int, sessions: int) -> float:
+    "Fire `concurrency` table loads at once; return requests/s"
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120, trust_env=False) as http:
+        async def one(n: int):
+            r = await http.post(f"{url}/api/rfis", json=BODY, headers={"X-Session-Id": f"bench-{n % sessions}"})
+            assert r.status_code == 200 and len(r.json()["items"]) == BODY["limit"], r.text[:200]
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(concurrency)))
+        return concurrency / (time.perf_counter() - start)
+
+
+def _waitress(app, port: int, threads: int):
+    from waitress.server import create_server
+
+    server = create_server(app, host="127.0.0.1", port=port, threads=threads, connection_limit=1000, backlog=1024)
+    threading.Thread(target=server.run, daemon=True).start()
+    return server.close
+
+
+def _uvicorn(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=1024))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+    return stop
+
+
+def run(concurrency=CONCURRENCY, latency: float = 0.05, threads: int = 16, sessions: int = 8):
+    _stub_env()
+    logging.getLogger("waitress.queue").setLevel(logging.ERROR)
+
+    import backend.api
+    from backend import asgi
+    from backend.api import API
+    from backend.main import app as wsgi_app
+    from backend.platforms.acc.client import build_http_session
+    from backend.sessions import sessions as wsgi_sessions
+
+    # Both apps search directly; the synced set would need a Redis server
+    backend.api.RFI_SYNC = False
+    rows = []
+    with StubACC(rfi_count=BODY["limit"], latency=latency) as stub:
+        wsgi_sessions.http = build_http_session()
+        wsgi_sessions.factory = lambda session_id: _pointed(API(session_id=session_id, http=wsgi_sessions.http), stub)
+        factory = asgi._create_session
+        asgi.sessions.factory = lambda session_id: _pointed(factory(session_id), stub)
+
+        servers = (
+            (f"waitress x{threads}", lambda port: _waitress(wsgi_app, port, threads)),
+            ("asgi", lambda port: _uvicorn(asgi.app, port)),
+        )
+        for label, start in servers:
+            port = _free_port()
+            stop = start(port)
+            try:
+                for n in concurrency:
+                    rows.append((label, n, asyncio.run(_load(f"http://127.0.0.1:{port}", n, sessions))))
+            finally:
+                stop()
+
+    print(f"{'server':>12} {'concurrent':>10} {'req/s':>8}")
+    for label, n, rps in rows:
+        print(f"{label:>12} {n:>10} {rps:>8.1f}")
+    return rows
+
+
+def _pointed(session, stub):
+    "Aim a session's Client (sync API or AsyncSession) at the stub"
+    point_at_stub(session.api.client if hasattr(session, "api") else session.client, stub)
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(CONCURRENCY))
+    parser.add_argument("--latency", type=float, default=0.05, help="stub latency per request (s)")
+    parser.add_argument("--threads", type=int, default=16, help="waitress worker threads")
+    parser.add_argument("--sessions", type=int, default=8, help="distinct session ids")
+    args = parser.parse_args()
+    run(tuple(args.concurrency), latency=args.latency, threads=args.threads, sessions=args.sessions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Load-test the Bottle app under waitress against the local stub ACC server:
+table loads per second from many concurrent sessions as server threads grow.
+
+    python -m backend.bench.concurrency --threads 1 2 4 8 16 --clients 32
+"""
+import argparse
+import logging
+import threading
+import time
+
+import requests
+
+from backend.bench.stub_acc import StubACC, _stub_env, point_at_stub
+from backend.bench.suite import _stop
+
+THREADS = (1, 2, 4, 8, 16)
+BODY = {"searchText": " ", "limit": 50, "fields": ["id", "customIdentifier", "title", "status"]}
+
+
+def _load(url: str, clients: int, requests_per_client: int, sessions: int) -> float:
+    "Fire requests from `clients` threads spread over `sessions` session ids; return requests/s"
+    errors = []
+
+    def worker(n: int):
+        http = requests.Session()
+        http.trust_env = False
+        headers = {"X-Session-Id": f"bench-{n % sessions}"}
+        for _ in range(requests_per_client):
+            r = http.post(f"{url}/api/rfis", json=BODY, headers=headers)
+            if r.status_code != 200 or len(r.json()["items"]) != BODY["limit"]:
+                errors.append(r.status_code)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    assert not errors, errors[:5]
+    return clients * requests_per_client / elapsed
+
+
+def run(threads=THREADS, clients: int = 32, requests_per_client: int = 4, sessions: int = 8, latency: float = 0.05):
+    _stub_env()
+    from waitress.server import create_server
+
+    import backend.api
+    from backend.api import API
+    from backend.main import app
+    from backend.platforms.acc.client import build_http_session
+    from backend.sessions import sessions as registry
+
+    # Queue-depth warnings are expected while the server is saturated
+    logging.getLogger("waitress.queue").setLevel(logging.ERROR)
+    # Sync off, so every table load does the full search work instead of a delta
+    backend.api.RFI_SYNC = False
+    rows = []
+    with StubACC(rfi_count=BODY["limit"], latency=latency) as stub:
+        def factory(session_id: str) -> API:
+            api = API(session_id=session_id, http=registry.http)
+            point_at_stub(api.client, stub)
+            return api
+
+        registry.http = build_http_session()
+        registry.factory = factory
+        for n in threads:
+            server = create_server(app, host="127.0.0.1", port=0, threads=n, connection_limit=clients * 2)
+            thread = threading.Thread(target=server.run, daemon=True)
+            thread.start()
+            try:
+                rps = _load(f"http://127.0.0.1:{server.effective_port}", clients, requests_per_client, sessions)
+            finally:
+                _stop(server, thread)
+            rows.append((n, rps))
+        assert len(registry) == sessions, registry.stats()
+
+    print(f"{'threads':>8} {'req/s':>8} {'scaling':>8}")
+    for n, rps in rows:
+        print(f"{n:>8} {rps:>8.1f} {rps / rows[0][1]:>7.1f}x")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=list(THREADS), help="waitress worker threads")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent client threads")
+    parser.add_argument("--requests", type=int, default=4, help="requests per client")
+    parser.add_argument("--sessions", type=int, default=8, help="distinct session ids")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub latency per request (s)")
+    args = parser.parse_args()
+    run(tuple(args.threads), clients=args.clients, requests_per_client=args.requests, sessions=args.sessions, latency=args.latency)
+
+
+if __name__ == "__main__":
+    main()
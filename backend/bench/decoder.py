@@ -0,0 +1,74 @@
+"""
+Micro-benchmark custom attribute flattening: re-reading fieldList.json per
+attribute (the old flatten_custom_attributes) vs. the compiled decoder.
+
+    python -m backend.bench.decoder --rfis 10000
+"""
+import argparse
+import json
+import random
+import time
+
+from backend.field_config import FIELD_LIST_PATH, CustomAttributeDecoder, FieldList
+
+
+def synthetic_rfis(n: int, custom_groups: dict, seed: int = 0):
+    rng = random.Random(seed)
+    groups = [(attr_id, list(group["options"])) for attr_id, group in custom_groups.items()]
+    rfis = []
+    for i in range(n):
+        attrs = [{"id": attr_id, "values": [rng.choice(options)]} for attr_id, options in groups]
+        attrs.append({"id": "free-text-attribute", "values": [f"note {i}"]})
+        rfis.append({"id": str(i), "customAttributes": attrs})
+    return rfis
+
+
+def legacy_flatten(rfi: dict) -> dict:
+    "The pre-compiled implementation: two file reads and JSON parses per mapped attribute"
+    def get_custom_mapping():
+        with open(FIELD_LIST_PATH, "r") as f:
+            return json.load(f)["custom_groups"]
+
+    for attr in rfi.pop("customAttributes", []):
+        attr_id = attr.get("id")
+        values = attr.get("values", [])
+        if attr_id and values:
+            if attr_id in get_custom_mapping():
+                rfi[attr_id] = get_custom_mapping()[attr_id]["options"][values[0]]
+            else:
+                rfi[attr_id] = values[0]
+    return rfi
+
+
+def run(n: int = 10000):
+    field_list = FieldList()
+    decoder = CustomAttributeDecoder(field_list)
+    source = synthetic_rfis(n, field_list.custom_groups)
+
+    batch = json.loads(json.dumps(source))
+    start = time.perf_counter()
+    legacy = [legacy_flatten(rfi) for rfi in batch]
+    legacy_time = time.perf_counter() - start
+
+    batch = json.loads(json.dumps(source))
+    start = time.perf_counter()
+    compiled = decoder.decode_many(batch)
+    compiled_time = time.perf_counter() - start
+
+    assert compiled == legacy and not decoder.unknown
+    print(f"{'mode':<10} {'total':>9} {'per RFI':>10}")
+    for name, elapsed in (("legacy", legacy_time), ("compiled", compiled_time)):
+        print(f"{name:<10} {elapsed:>8.3f}s {elapsed / n * 1e6:>8.1f}us")
+    print(f"speedup {legacy_time / compiled_time:.0f}x")
+    return legacy_time, compiled_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rfis", type=int, default=10000)
+    args = parser.parse_args()
+    run(args.rfis)
+
+
+if __name__ == "__main__":
+    main()
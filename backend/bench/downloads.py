@@ -0,0 +1,60 @@
+"""
+Benchmark sequential vs. pooled attachment downloads against the local stub ACC server,
+without and with the content-addressed blob store (the stub shares a few files
+across many RFIs).
+
+    python -m backend.bench.downloads --rfis 40 --latency 0.05 --workers 8
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+from backend.bench.stub_acc import StubACC, stub_client
+
+
+def run(rfi_count: int = 40, latency: float = 0.05, workers: int = 8, blob_size: int = 512 * 1024):
+    from backend.platforms.acc.blob_store import BlobStore
+    from backend.platforms.acc.downloads import download_rfi_attachments
+
+    rows = []
+    with StubACC(rfi_count=rfi_count, latency=latency, blob_size=blob_size) as stub:
+        client = stub_client(stub)
+        folder = tempfile.mkdtemp(prefix="acc-dl-")
+        store = BlobStore(f"{folder}/.blobs")
+        try:
+            # Without a store each RFI folder is a full copy; the second store pass
+            # fills fresh RFI folders from the blobs kept by the first
+            passes = (
+                ("sequential", 1, None, "plain-1"),
+                ("pooled", workers, None, "plain-2"),
+                ("store", workers, store, "store-1"),
+                ("store again", workers, store, "store-2"),
+            )
+            for label, w, pass_store, sub in passes:
+                start = time.perf_counter()
+                report = download_rfi_attachments(client, stub.rfis, f"{folder}/{sub}", workers=w, store=pass_store)
+                elapsed = time.perf_counter() - start
+                assert not report.failures, report.failures
+                rows.append((label, len(report.completed), report.reused, report.bytes_downloaded, elapsed))
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    print(f"{'mode':>12} {'files':>6} {'reused':>7} {'MiB fetched':>12} {'time':>8}")
+    for label, files, reused, size, elapsed in rows:
+        print(f"{label:>12} {files:>6} {reused:>7} {size / (1024 * 1024):>12.1f} {elapsed:>7.2f}s")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rfis", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub latency per request (s)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--blob-size", type=int, default=512 * 1024, help="bytes per attachment")
+    args = parser.parse_args()
+    run(args.rfis, latency=args.latency, workers=args.workers, blob_size=args.blob_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark sequential vs. pooled RFI hydration against the local stub ACC server.
+
+    python -m backend.bench.hydrate --latency 0.05 --workers 16
+"""
+import argparse
+import time
+
+from backend.bench.stub_acc import StubACC, _stub_env, stub_client
+
+SIZES = (50, 200, 1000)
+
+
+def run(sizes=SIZES, latency: float = 0.05, workers: int = 16):
+    # Before any backend import: modules read their settings when loaded
+    _stub_env()
+    from backend.platforms.acc.rfis import hydrate_rfis
+    from backend.rfi_cache import rfi_cache
+
+    # Every run should go to the stub, not the RFI cache
+    rfi_cache.enabled = False
+    with StubACC(rfi_count=max(sizes), latency=latency) as stub:
+        client = stub_client(stub)
+        ids = [r["id"] for r in stub.rfis]
+        rows = []
+        for n in sizes:
+            timings = {}
+            for w in (1, workers):
+                start = time.perf_counter()
+                result = hydrate_rfis(client, ids[:n], workers=w)
+                timings[w] = time.perf_counter() - start
+                assert len(result.items) == n and not result.failures
+                assert [r["id"] for r in result.items] == ids[:n]
+            rows.append((n, timings[1], timings[workers], timings[1] / timings[workers]))
+
+    print(f"{'ids':>6} {'sequential':>12} {f'{workers} workers':>12} {'speedup':>8}")
+    for n, seq, par, speedup in rows:
+        print(f"{n:>6} {seq:>11.2f}s {par:>11.2f}s {speedup:>7.1f}x")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="stub latency per request (s)")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    args = parser.parse_args()
+    run(tuple(args.sizes), latency=args.latency, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Per-request latency with a fresh connection per call vs. the Client's pooled
+keep-alive session, against the local stub over TLS.
+
+    python -m backend.bench.keepalive --requests 200
+"""
+import argparse
+import statistics
+import time
+import warnings
+
+import requests
+from urllib3.exceptions import InsecureRequestWarning
+
+from backend.bench.stub_acc import StubACC, stub_client
+
+
+def _timed(fn, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def run(n: int = 200):
+    warnings.simplefilter("ignore", InsecureRequestWarning)
+    with StubACC(rfi_count=1, latency=0, tls=True) as stub:
+        client = stub_client(stub)
+        rfi_id = stub.rfis[0]["id"]
+        # client.get rather than get_rfi_by_id, which rfi_cache would answer without a request
+        path = f"construction/rfis/v3/projects/{client.project_id}/rfis/{rfi_id}"
+        url = client._url(path)
+
+        def fresh_get():
+            with requests.Session() as session:
+                session.trust_env = False
+                session.get(url, headers=client.headers, verify=False)
+
+        fresh = _timed(fresh_get, n)
+        pooled = _timed(lambda: client.get(path=path), n)
+
+    print(f"{'mode':<10} {'median':>9} {'p95':>9}")
+    for name, samples in (("fresh", fresh), ("pooled", pooled)):
+        p95 = statistics.quantiles(samples, n=20)[-1]
+        print(f"{name:<10} {statistics.median(samples):>7.2f}ms {p95:>7.2f}ms")
+    return fresh, pooled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    run(args.requests)
+
+
+if __name__ == "__main__":
+    main()
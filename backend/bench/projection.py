@@ -0,0 +1,61 @@
+"""
+Count ACC calls per table load: legacy search + GET per RFI vs. search projection.
+
+    python -m backend.bench.projection --rfis 200
+"""
+import argparse
+import time
+
+from backend.bench.stub_acc import StubACC, _stub_env, stub_api
+
+FIELDS = ["id", "customIdentifier", "title", "status", "question", "ba7a05f1-6973-45f6-afbd-62d30cf79979"]
+
+
+def run(rfi_count: int = 200, latency: float = 0.02):
+    # Before any backend import: modules read their settings when loaded
+    _stub_env()
+    from backend.main import flatten_custom_attributes
+    from backend.platforms.acc.rfis import DETAIL_ONLY_FIELDS, hydrate_rfis
+
+    with StubACC(rfi_count=rfi_count, latency=latency) as stub:
+        api = stub_api(stub)
+        filters = {"searchText": " ", "limit": rfi_count}
+
+        start = time.perf_counter()
+        legacy = hydrate_rfis(api.client, api.get_rfis(filters), transform=flatten_custom_attributes)
+        legacy_time = time.perf_counter() - start
+        legacy_calls = dict(stub.calls)
+
+        stub.reset_calls()
+        start = time.perf_counter()
+        projected = api.get_rfi_rows(filters, FIELDS, transform=flatten_custom_attributes)
+        projected_time = time.perf_counter() - start
+        projected_calls = dict(stub.calls)
+
+    assert not legacy.failures and not projected.failures
+    # Every projected field must come back from the search itself; an empty one
+    # means DETAIL_ONLY_FIELDS is missing a field search:rfis leaves out
+    projected_fields = [key for key in FIELDS if key not in DETAIL_ONLY_FIELDS]
+    empty = sorted({key for row in projected.items for key in projected_fields if row.get(key) in (None, "", [])})
+    assert not empty, f"search:rfis returned no value for {empty}"
+    assert [r["id"] for r in projected.items] == [r["id"] for r in legacy.items]
+    for row, full in zip(projected.items, legacy.items):
+        assert all(row.get(key) == full.get(key) for key in FIELDS)
+    assert projected_calls == {"search": 1}, projected_calls
+
+    print(f"{'mode':<12} {'calls':>6} {'time':>8}")
+    print(f"{'legacy':<12} {sum(legacy_calls.values()):>6} {legacy_time:>7.2f}s")
+    print(f"{'projection':<12} {sum(projected_calls.values()):>6} {projected_time:>7.2f}s")
+    return legacy_calls, projected_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rfis", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub latency per request (s)")
+    args = parser.parse_args()
+    run(args.rfis, latency=args.latency)
+
+
+if __name__ == "__main__":
+    main()
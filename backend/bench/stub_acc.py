@@ -0,0 +1,372 @@
+# Local stand-in for the ACC RFI v3 API, used by the benchmark scripts.
+import hashlib
+import json
+import os
+import random
+import re
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote, unquote
+
+PROJECT_ID = "stub-project"
+USER_ID = "stub-user"
+
+# Custom attribute from userInput/fieldList.json ("Increment" -> "INC 1")
+INCREMENT_ATTR = ("ba7a05f1-6973-45f6-afbd-62d30cf79979", "75373abc-2edc-41af-8b17-6ef43d7b369e")
+
+# Detail fields the real search:rfis projection leaves out
+DETAIL_ONLY = ("responses",)
+
+USER_PATH = re.compile(r"^/construction/rfis/v3/projects/[^/]+/users/me$")
+RFI_PATH = re.compile(r"^/construction/rfis/v3/projects/[^/]+/rfis/([^/]+)$")
+SEARCH_PATH = re.compile(r"^/construction/rfis/v3/projects/[^/]+/search:rfis$")
+ATTACHMENTS_PATH = re.compile(r"^/construction/rfis/v3/projects/[^/]+/rfis/([^/]+)/attachments$")
+SIGNED_PATH = re.compile(r"^/oss/v2/buckets/([^/]+)/objects/([^/]+)/signeds3download$")
+BATCH_SIGNED_PATH = re.compile(r"^/oss/v2/buckets/([^/]+)/objects/batchsigneds3download$")
+BLOB_PATH = re.compile(r"^/s3/([^/]+)/([^/]+)$")
+RANGE_HEADER = re.compile(r"^bytes=(\d+)-$")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Default backlog of 5 drops connections under a parallel client
+    request_queue_size = 256
+
+
+def self_signed_context() -> ssl.SSLContext:
+    "Server SSL context with a throwaway self-signed localhost certificate (needs the openssl CLI)"
+    folder = tempfile.mkdtemp(prefix="stub-acc-")
+    cert, key = os.path.join(folder, "cert.pem"), os.path.join(folder, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+def _ts(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def make_rfi(i: int) -> Dict[str, Any]:
+    "Build a synthetic RFI payload shaped like the ACC detail response"
+    day = 1 + i % 28
+    return {
+        "id": str(uuid.UUID(int=i + 1)),
+        "customIdentifier": f"{i + 1:05d}",
+        "title": f"Stub RFI {i + 1}",
+        "status": "open",
+        "question": "Please clarify the detail at gridline " + str(i),
+        "assignedTo": [{"id": USER_ID}],
+        "createdAt": f"2025-01-{day:02d}T08:00:00.000Z",
+        "updatedAt": f"2025-02-{day:02d}T08:00:00.000Z",
+        "customAttributes": [{"id": INCREMENT_ATTR[0], "values": [INCREMENT_ATTR[1]]}],
+        "responses": [],
+    }
+
+
+class StubACC:
+    """
+    Threaded HTTP server answering users/me, search:rfis, rfis/{id}, RFI
+    attachments, OSS signed downloads (single and batch) and the signed blob
+    URLs (with Range) using synthetic data. Every request sleeps for `latency`
+    seconds to mimic the ACC round-trip; `calls` counts requests per route.
+    Search pages hold at most `max_page_size` rows, whatever limit is asked for.
+    A `throttle_rate` share of API requests (not blobs) is answered 429 with
+    Retry-After `retry_after`, and an `error_rate` share 503, chosen by a
+    random generator seeded with `seed`. With tls=True it serves HTTPS with a
+    self-signed certificate.
+    """
+
+    def __init__(
+        self,
+        rfi_count: int = 200,
+        latency: float = 0.02,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        tls: bool = False,
+        attachments_per_rfi: int = 2,
+        shared_files: int = 8,
+        blob_size: int = 256 * 1024,
+        max_page_size: int = 200,
+        throttle_rate: float = 0.0,
+        error_rate: float = 0.0,
+        retry_after: int = 1,
+        seed: int = 0
+    ):
+        self.rfis: List[Dict[str, Any]] = [make_rfi(i) for i in range(rfi_count)]
+        self.by_id = {r["id"]: r for r in self.rfis}
+        self.index = {r["id"]: i for i, r in enumerate(self.rfis)}
+        self.attachments_per_rfi = attachments_per_rfi
+        self.shared_files = max(1, shared_files)
+        self.blob_size = blob_size
+        self._blobs: Dict[str, bytes] = {}
+        self.latency = latency
+        self.max_page_size = max_page_size
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self.server = _Server((host, port), self._handler())
+        self.tls = tls
+        if tls:
+            self.server.socket = self_signed_context().wrap_socket(self.server.socket, server_side=True)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        scheme = "https" if self.tls else "http"
+        return f"{scheme}://{host}:{port}"
+
+    def count(self, route: str):
+        with self._lock:
+            self.calls[route] += 1
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    def fault(self) -> Optional[int]:
+        "Status to answer with instead of the real response, if one is injected"
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 503
+        return None
+
+    def matches(self, rfi: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+        "Apply the subset of search:rfis filters the backend sends"
+        if "status" in filters and rfi.get("status") not in filters["status"]:
+            return False
+        for key in ("createdAt", "updatedAt"):
+            if key in filters:
+                start, _, end = filters[key].partition("..")
+                stamp = _ts(rfi.get(key))
+                if (start and stamp < _ts(start)) or (end and stamp > _ts(end)):
+                    return False
+        return True
+
+    def search(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        limit = min(int(body.get("limit") or 200), self.max_page_size)
+        offset = int(body.get("offset") or 0)
+        fields = [k for k in body.get("fields") or [] if k not in DETAIL_ONLY]
+        filters = body.get("filter") or {}
+        hits = [r for r in self.rfis if self.matches(r, filters)]
+        for sort in reversed(body.get("sort") or []):
+            hits.sort(key=lambda r: r.get(sort["field"]) or "", reverse=sort.get("order") == "DESC")
+        page = hits[offset:offset + limit]
+        if fields:
+            page = [{k: r.get(k) for k in fields if k in r} for r in page]
+        else:
+            page = [{k: v for k, v in r.items() if k not in DETAIL_ONLY} for r in page]
+        return {
+            "pagination": {"limit": limit, "offset": offset, "totalResults": len(hits)},
+            "results": page,
+        }
+
+    def attachments(self, rfi_id: str) -> List[Dict[str, Any]]:
+        "Attachments cycle through `shared_files` names, so many RFIs share the same objects"
+        i = self.index[rfi_id]
+        results = []
+        for k in range(self.attachments_per_rfi):
+            name = f"sheet-{(i + k) % self.shared_files:03d}.pdf"
+            results.append({
+                "id": f"{rfi_id}-{k}",
+                "displayName": name,
+                "storageUrn": f"urn:adsk.objects:os.object:wip.dm.prod/{name}",
+            })
+        return results
+
+    def signed(self, bucket: str, object_key: str) -> Dict[str, Any]:
+        "A signeds3download result pointing at this server's blob route"
+        url = f"{self.url}/s3/{bucket}/{quote(object_key, safe='')}?X-Amz-Expires=3600"
+        return {"status": "complete", "url": url, "size": self.blob_size}
+
+    def blob(self, object_key: str) -> bytes:
+        "Deterministic `blob_size` bytes of content for an object key"
+        with self._lock:
+            data = self._blobs.get(object_key)
+            if data is None:
+                seed = hashlib.sha256(object_key.encode("utf-8")).digest()
+                data = (seed * (self.blob_size // len(seed) + 1))[:self.blob_size]
+                self._blobs[object_key] = data
+            return data
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in one segment, avoiding Nagle/delayed-ACK stalls on keep-alive
+            disable_nagle_algorithm = True
+            wbufsize = -1
+
+            def _send(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _fault(self, path: str) -> bool:
+                "Answer with an injected 429/503 (blob downloads are never faulted)"
+                if BLOB_PATH.match(path):
+                    return False
+                status = stub.fault()
+                if status is None:
+                    return False
+                stub.count(str(status))
+                headers = {"Retry-After": str(stub.retry_after)} if status == 429 else {}
+                self._send(status, {"detail": "injected fault"}, headers)
+                return True
+
+            def _send_bytes(self, status: int, data: bytes, headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _blob(self, object_key: str):
+                data = stub.blob(object_key)
+                match = RANGE_HEADER.match(self.headers.get("Range") or "")
+                if not match:
+                    return self._send_bytes(200, data, {"Accept-Ranges": "bytes"})
+                start = int(match.group(1))
+                if start >= len(data):
+                    return self._send_bytes(416, b"", {"Content-Range": f"bytes */{len(data)}"})
+                return self._send_bytes(206, data[start:], {"Content-Range": f"bytes {start}-{len(data) - 1}/{len(data)}"})
+
+            def _body(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length") or 0)
+                if not length:
+                    return {}
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_GET(self):
+                time.sleep(stub.latency)
+                path = self.path.split("?")[0]
+                if self._fault(path):
+                    return
+                if USER_PATH.match(path):
+                    stub.count("user")
+                    return self._send(200, {"user": {"id": USER_ID}})
+                match = RFI_PATH.match(path)
+                if match:
+                    stub.count("rfi")
+                    rfi = stub.by_id.get(match.group(1))
+                    if rfi is None:
+                        return self._send(404, {"detail": "not found"})
+                    return self._send(200, rfi)
+                match = ATTACHMENTS_PATH.match(path)
+                if match and match.group(1) in stub.index:
+                    stub.count("attachments")
+                    return self._send(200, {"results": stub.attachments(match.group(1))})
+                match = SIGNED_PATH.match(path)
+                if match:
+                    stub.count("signed")
+                    return self._send(200, stub.signed(match.group(1), unquote(match.group(2))))
+                match = BLOB_PATH.match(path)
+                if match:
+                    stub.count("blob")
+                    return self._blob(unquote(match.group(2)))
+                stub.count("unknown")
+                self._send(404, {"detail": "not found"})
+
+            def do_POST(self):
+                body = self._body()
+                time.sleep(stub.latency)
+                path = self.path.split("?")[0]
+                if self._fault(path):
+                    return
+                if SEARCH_PATH.match(path):
+                    stub.count("search")
+                    return self._send(200, stub.search(body))
+                match = BATCH_SIGNED_PATH.match(path)
+                if match:
+                    stub.count("batch_signed")
+                    keys = [r.get("objectKey") for r in body.get("requests", [])]
+                    return self._send(200, {"results": {key: stub.signed(match.group(1), key) for key in keys}})
+                stub.count("unknown")
+                self._send(404, {"detail": "not found"})
+
+            def log_message(self, format, *args):
+                return
+
+        return Handler
+
+    def start(self) -> "StubACC":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "StubACC":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _stub_env():
+    os.environ.setdefault("APS_CLIENT_ID", "stub-client")
+    os.environ.setdefault("APS_CLIENT_SECRET", "stub-secret")
+    os.environ.setdefault("APS_REDIRECT_URI", "http://localhost:8000/callback")
+    os.environ.setdefault("ACC_PROJECT_ID", PROJECT_ID)
+    os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    # The stub has no rate limits; benchmarks measure the backend, not the APS budget
+    os.environ.setdefault("ACC_RATE_LIMIT_ENABLED", "0")
+
+
+def point_at_stub(client, stub: StubACC):
+    "Aim an existing backend Client at the stub with a dummy access token"
+    client.BASE_URL = stub.url
+    client.project_id = PROJECT_ID
+    client.access_token = "stub-token"
+    client.expires_at = time.time() + 3600
+    client.user_id = [USER_ID]
+    if stub.tls:
+        # trust_env would let REQUESTS_CA_BUNDLE override verify=False
+        client.http.trust_env = False
+        client.http.verify = False
+    return client
+
+
+def stub_client(stub: StubACC):
+    "Create a backend Client pointed at the stub"
+    _stub_env()
+    from backend.platforms.acc.client import Client
+    return point_at_stub(Client(), stub)
+
+
+def stub_api(stub: StubACC):
+    "Create a backend API whose Client is pointed at the stub"
+    _stub_env()
+    from backend.api import API
+    api = API()
+    point_at_stub(api.client, stub)
+    return api
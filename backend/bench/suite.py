@@ -0,0 +1,225 @@
+"""
+End-to-end benchmark suite: the Bottle app under waitress against the stub
+ACC server, driving table loads, exports and attachment downloads over HTTP.
+RFI and signed-URL caches are off so every round does the full ACC work.
+Results can be saved as JSON and compared with a saved baseline, so CI can
+fail on a regression without network access.
+
+    python -m backend.bench.suite --rounds 5 --json bench.json
+    python -m backend.bench.suite --baseline bench.json --tolerance 0.25
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from backend.bench.stub_acc import StubACC, _stub_env, point_at_stub
+
+BASE_FIELDS = ["id", "customIdentifier", "title", "status"]
+# Stub statuses that are injected faults rather than ACC work
+FAULT_CALLS = ("429", "503")
+
+
+def _post(http: requests.Session, url: str, body: dict, session: str) -> requests.Response:
+    r = http.post(url, json=body, headers={"X-Session-Id": session})
+    assert r.status_code == 200, f"{url} -> {r.status_code}: {r.text[:200]}"
+    return r
+
+
+def _scenarios(rfi_count: int, attachments: int) -> Dict[str, Callable[[requests.Session, str, int], None]]:
+    "name -> run(http, base url, round number); each run asserts the response is complete"
+
+    def table(http, url, n, session="bench", fields=BASE_FIELDS):
+        items = _post(http, f"{url}/api/rfis", {"limit": 200, "fields": fields}, session).json()["items"]
+        assert len(items) == rfi_count, len(items)
+
+    def table_detail(http, url, n):
+        table(http, url, n, fields=BASE_FIELDS + ["responses"])
+
+    def faults(http, url, n):
+        table(http, url, n, session="bench-faults", fields=BASE_FIELDS + ["responses"])
+
+    def export_csv(http, url, n):
+        body = _post(http, f"{url}/api/rfis/export", {"format": "csv", "fields": BASE_FIELDS}, "bench").text
+        assert len(body.strip().splitlines()) == rfi_count + 1
+
+    def export_xlsx(http, url, n):
+        body = _post(http, f"{url}/api/rfis/export", {"format": "xlsx", "fields": BASE_FIELDS}, "bench").content
+        assert body[:2] == b"PK", body[:20]
+
+    def download(http, url, n):
+        # A fresh folder (and blob store) per round, so nothing is reused
+        report = _post(http, f"{url}/api/rfis/attachments/download", {"folder": f"round-{n}"}, "bench").json()
+        assert report["failed"] == 0 and report["completed"] == rfi_count * attachments, report
+
+    return {
+        "table": table,
+        "table_detail": table_detail,
+        "export_csv": export_csv,
+        "export_xlsx": export_xlsx,
+        "download": download,
+        "faults": faults,
+    }
+
+
+def _stop(server, thread: threading.Thread):
+    "Close every channel from the server's own loop, so the loop returns instead of failing on closed sockets"
+    from waitress import wasyncore
+
+    server.trigger.pull_trigger(lambda: wasyncore.close_all(server._map))
+    thread.join(timeout=5)
+    server.task_dispatcher.shutdown()
+
+
+def run(
+    scenarios: Optional[List[str]] = None,
+    rounds: int = 5,
+    rfi_count: int = 200,
+    latency: float = 0.02,
+    page_size: int = 100,
+    throttle_rate: float = 0.02,
+    error_rate: float = 0.02,
+    threads: int = 8
+) -> Dict[str, dict]:
+    "Run each scenario once to warm up, then `rounds` times; return timings and ACC calls per round"
+    _stub_env()
+    # Keep injected-fault retries short; 429s still wait out the stub's Retry-After
+    os.environ.setdefault("ACC_HTTP_BACKOFF", "0.05")
+    os.environ.setdefault("ACC_HTTP_BACKOFF_JITTER", "0.05")
+    from waitress.server import create_server
+
+    import backend.api
+    from backend.api import API
+    from backend.main import app
+    from backend.platforms.acc.client import build_http_session
+    from backend.rfi_cache import rfi_cache
+    from backend.sessions import sessions as registry
+    from backend.signed_url_cache import signed_url_cache
+
+    logging.getLogger("waitress.queue").setLevel(logging.ERROR)
+    # Rows come straight from search; the synced set would answer repeat loads from Redis
+    backend.api.RFI_SYNC = False
+    rfi_cache.enabled = False
+    signed_url_cache.enabled = False
+
+    stub = StubACC(rfi_count=rfi_count, latency=latency, max_page_size=page_size)
+    faulty = StubACC(
+        rfi_count=rfi_count, latency=latency, max_page_size=page_size,
+        throttle_rate=throttle_rate, error_rate=error_rate, retry_after=1,
+    )
+
+    def factory(session_id: str) -> API:
+        api = API(session_id=session_id, http=registry.http)
+        point_at_stub(api.client, faulty if session_id.endswith("-faults") else stub)
+        # Resolve the user through users/me like a real session
+        api.client.user_id = None
+        return api
+
+    registry.http = build_http_session()
+    registry.factory = factory
+    results: Dict[str, dict] = {}
+    with stub, faulty, tempfile.TemporaryDirectory(prefix="bench-suite-") as folder:
+        # Downloads may only go inside DOWNLOAD_DIR, read per request
+        os.environ["DOWNLOAD_DIR"] = folder
+        server = create_server(app, host="127.0.0.1", port=0, threads=threads)
+        loop = threading.Thread(target=server.run, daemon=True)
+        loop.start()
+        url = f"http://127.0.0.1:{server.effective_port}"
+        http = requests.Session()
+        http.trust_env = False
+        try:
+            available = _scenarios(rfi_count, stub.attachments_per_rfi)
+            for name in scenarios or list(available):
+                scenario = available[name]
+                target = faulty if name == "faults" else stub
+                scenario(http, url, 0)
+                target.reset_calls()
+                seconds = []
+                for n in range(1, rounds + 1):
+                    start = time.perf_counter()
+                    scenario(http, url, n)
+                    seconds.append(time.perf_counter() - start)
+                calls = Counter(target.calls)
+                results[name] = {
+                    "median_s": statistics.median(seconds),
+                    "best_s": min(seconds),
+                    "worst_s": max(seconds),
+                    "rounds": rounds,
+                    "acc_calls": sum(v for k, v in calls.items() if k not in FAULT_CALLS) / rounds,
+                    "faults": sum(calls[k] for k in FAULT_CALLS) / rounds,
+                    "calls": {k: v / rounds for k, v in sorted(calls.items())},
+                }
+        finally:
+            http.close()
+            _stop(server, loop)
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    "Scenarios slower than baseline by more than `tolerance`, or making more ACC calls"
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = result["median_s"] / base["median_s"]
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name}: median {result['median_s']:.3f}s vs {base['median_s']:.3f}s ({ratio:.2f}x)")
+        if result["acc_calls"] > base["acc_calls"]:
+            regressions.append(f"{name}: {result['acc_calls']:g} ACC calls per round vs {base['acc_calls']:g}")
+    return regressions
+
+
+def report(results: Dict[str, dict], baseline: Optional[Dict[str, dict]] = None):
+    print(f"{'scenario':<13} {'median s':>9} {'best s':>8} {'worst s':>8} {'ACC calls':>10} {'faults':>7} {'vs base':>8}")
+    for name, r in results.items():
+        base = (baseline or {}).get(name)
+        change = f"{r['median_s'] / base['median_s']:.2f}x" if base else "-"
+        print(f"{name:<13} {r['median_s']:>9.3f} {r['best_s']:>8.3f} {r['worst_s']:>8.3f} {r['acc_calls']:>10g} {r['faults']:>7g} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", help="subset to run (default: all)")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--rfis", type=int, default=200, help="RFIs served by the stub")
+    parser.add_argument("--latency", type=float, default=0.02, help="stub latency per request (s)")
+    parser.add_argument("--page-size", type=int, default=100, help="largest search page the stub returns")
+    parser.add_argument("--throttle", type=float, default=0.02, help="share of requests answered 429 in the faults scenario")
+    parser.add_argument("--errors", type=float, default=0.02, help="share of requests answered 503 in the faults scenario")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed median slowdown vs. the baseline")
+    args = parser.parse_args()
+
+    results = run(
+        args.scenarios, rounds=args.rounds, rfi_count=args.rfis, latency=args.latency,
+        page_size=args.page_size, throttle_rate=args.throttle, error_rate=args.errors,
+    )
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RFI_COALESCE_ENABLED = os.getenv("RFI_COALESCE_ENABLED", "1") != "0"
+# Seconds a finished table load keeps answering identical queries; 0 only shares in-flight loads
+RFI_RESULT_TTL = float(os.getenv("RFI_RESULT_TTL", 0))
+RFI_RESULT_CACHE_SIZE = int(os.getenv("RFI_RESULT_CACHE_SIZE", 64))
+
+
+def request_key(*parts: Any) -> str:
+    "Stable key for JSON-serialisable parts; dict key order does not matter"
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class _Results:
+    "Finished results kept for `ttl` seconds in a small LRU"
+
+    def __init__(self, ttl: float, max_results: int):
+        self.ttl = ttl
+        self.max_results = max_results
+        self._results: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._results.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._results[key]
+            return False, None
+        self._results.move_to_end(key)
+        return True, value
+
+    def put(self, key: str, value: Any):
+        if self.ttl <= 0:
+            return
+        self._results[key] = (time.monotonic() + self.ttl, value)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+
+class SingleFlight:
+    """
+    Run one computation per key at a time. Threads asking for a key that is
+    already being computed wait for that result (or exception) instead of
+    starting their own. With `ttl` > 0 the result also answers identical
+    requests for `ttl` seconds after it finished.
+    Results are shared between callers, so they must be treated as read-only.
+    """
+
+    def __init__(self, ttl: float = RFI_RESULT_TTL, max_results: int = RFI_RESULT_CACHE_SIZE, enabled: bool = RFI_COALESCE_ENABLED):
+        self.enabled = enabled
+        self._results = _Results(ttl, max_results)
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "coalesced": 0, "result_hits": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        "Return (result, shared); shared is True when another caller's result was reused"
+        if not self.enabled:
+            return fn(), False
+
+        with self._lock:
+            found, value = self._results.get(key)
+            if found:
+                self.counters["result_hits"] += 1
+                return value, True
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.counters["calls"] += 1
+            else:
+                call.waiters += 1
+                self.counters["coalesced"] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                if call.error is None:
+                    self._results.put(key, call.value)
+            call.done.set()
+            if call.waiters:
+                logger.debug(f"[SingleFlight] {call.waiters} caller(s) shared {key[:12]}")
+        return call.value, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["in_flight"] = len(self._calls)
+            stats["results"] = len(self._results)
+        return stats
+
+
+class AsyncSingleFlight:
+    "SingleFlight for coroutines on one event loop; followers await the leader's task"
+
+    def __init__(self, ttl: float = RFI_RESULT_TTL, max_results: int = RFI_RESULT_CACHE_SIZE, enabled: bool = RFI_COALESCE_ENABLED):
+        self.enabled = enabled
+        self._results = _Results(ttl, max_results)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.counters = {"calls": 0, "coalesced": 0, "result_hits": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        if not self.enabled:
+            return await fn(), False
+
+        found, value = self._results.get(key)
+        if found:
+            self.counters["result_hits"] += 1
+            return value, True
+        task = self._tasks.get(key)
+        if task is not None:
+            self.counters["coalesced"] += 1
+            # shield: a follower that disconnects must not cancel the shared load
+            return await asyncio.shield(task), True
+
+        self.counters["calls"] += 1
+        task = self._tasks[key] = asyncio.ensure_future(fn())
+
+        def finished(task: asyncio.Task):
+            self._tasks.pop(key, None)
+            if not task.cancelled() and task.exception() is None:
+                self._results.put(key, task.result())
+
+        task.add_done_callback(finished)
+        return await asyncio.shield(task), False
+
+    def stats(self) -> dict:
+        stats = dict(self.counters)
+        stats["in_flight"] = len(self._tasks)
+        stats["results"] = len(self._results)
+        return stats
@@ -0,0 +1,221 @@
+import csv
+import io
+import itertools
+import json
+import os
+import re
+import tempfile
+import unicodedata
+from datetime import datetime
+from urllib.parse import quote
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Rows are flushed to the response in chunks of roughly this many bytes
+CSV_CHUNK_SIZE = 64 * 1024
+FILE_CHUNK_SIZE = 1024 * 1024
+# Rows read ahead to size xlsx columns
+XLSX_WIDTH_SAMPLE = 50
+DEFAULT_EXPORT_NAME = "RFI_Export"
+# Control characters, path separators and characters that end or escape a quoted header value
+_UNSAFE_FILENAME = re.compile(r'[\x00-\x1f\x7f"\\/;:*?<>|]+')
+
+
+def export_filename(filename: Any, fmt: str) -> str:
+    "A client-supplied file name reduced to a safe base name with the export's extension"
+    name = _UNSAFE_FILENAME.sub("_", os.path.basename(str(filename or "").replace("\\", "/")))
+    stem, ext = os.path.splitext(name)
+    if ext.lower() != f".{fmt}":
+        stem = name
+    stem = stem.strip(" ._")[:200] or DEFAULT_EXPORT_NAME
+    return f"{stem}.{fmt}"
+
+
+def content_disposition(filename: str) -> str:
+    """
+    Content-Disposition for an export_filename() result: an ASCII
+    filename for old clients, plus RFC 5987 filename* when it has other
+    characters.
+    """
+    ascii_name = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+    ascii_name = _UNSAFE_FILENAME.sub("_", ascii_name)
+    if ascii_name.startswith("."):
+        ascii_name = DEFAULT_EXPORT_NAME + ascii_name
+    if ascii_name == filename:
+        return f'attachment; filename="{filename}"'
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def cell_value(value: Any) -> Any:
+    "Render a row value as a flat spreadsheet cell"
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _date(value: Any) -> str:
+    "Local calendar date as M/D/YYYY, like the browser's en-US toLocaleDateString"
+    try:
+        d = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return str(value)
+    if d.tzinfo is not None:
+        d = d.astimezone()
+    return f"{d.month}/{d.day}/{d.year}"
+
+
+def _number(value: Any) -> str:
+    try:
+        n = float(value)
+    except (TypeError, ValueError):
+        return "NaN"
+    return str(int(n)) if n.is_integer() else repr(n)
+
+
+def format_responses(items: Any, user_map: Dict[str, str]) -> str:
+    "Responses newest first, one paragraph each: [date] (status) author: text"
+    if not isinstance(items, list) or not items:
+        return "-"
+
+    def newest(item):
+        stamps = []
+        for key in ("updatedAt", "createdAt"):
+            try:
+                stamps.append(datetime.fromisoformat(str(item.get(key)).replace("Z", "+00:00")).timestamp())
+            except ValueError:
+                pass
+        return max(stamps, default=0)
+
+    lines = []
+    for item in sorted((i for i in items if isinstance(i, dict)), key=newest, reverse=True):
+        stamp = item.get("updatedAt") or item.get("createdAt")
+        created_by = item.get("createdBy") or ""
+        name = user_map.get(created_by, created_by)
+        parts = [
+            f"[{_date(stamp)}] " if stamp else "",
+            f"({item['status']}) " if item.get("status") else "",
+            f"{name}: " if name else "",
+            item.get("text") or "",
+        ]
+        lines.append("".join(parts).strip())
+    return "\n\n".join(lines)
+
+
+def format_cell(value: Any, field_type: Optional[str], user_map: Dict[str, str]) -> str:
+    "A cell as the table shows it: dates, user names, Yes/No, responses, and '-' for empty"
+    if value is None or value == "":
+        return "-"
+    t = str(field_type or "string").lower()
+    if t in ("date", "datetime"):
+        return _date(value)
+    if t == "userid" and isinstance(value, str):
+        return user_map.get(value, value)
+    if t == "boolean":
+        return "Yes" if value else "No"
+    if t in ("number", "int"):
+        return _number(value)
+    if t == "array[object]":
+        return format_responses(value, user_map)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def format_rows(
+    rows: Iterable[Dict[str, Any]], fields: List[str], types: Dict[str, str], user_map: Optional[Dict[str, str]] = None
+) -> Iterator[Dict[str, str]]:
+    "Rows with every field rendered by format_cell"
+    user_map = user_map or {}
+    for row in rows:
+        yield {key: format_cell(row.get(key), types.get(key), user_map) for key in fields}
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]], fields: List[str], headers: List[str]) -> Iterator[bytes]:
+    """
+    Encode rows as CSV, yielding UTF-8 chunks as rows arrive so the whole
+    export never sits in memory. A BOM is written first so Excel detects UTF-8.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    yield b"\xef\xbb\xbf" + buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+
+    for row in rows:
+        writer.writerow([cell_value(row.get(key)) for key in fields])
+        if buffer.tell() >= CSV_CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _column_width(header: str, rows: List[Dict[str, Any]], key: str) -> int:
+    "Longest header or first line in the sampled rows, clamped to 12-60 characters"
+    longest = len(str(header))
+    for row in rows:
+        longest = max(longest, len(str(cell_value(row.get(key))).split("\n")[0]))
+    return min(max(longest + 2, 12), 60)
+
+
+def write_xlsx(rows: Iterable[Dict[str, Any]], fields: List[str], headers: List[str], path: str) -> str:
+    """
+    Write rows to an .xlsx file with openpyxl's write-only workbook, which
+    streams rows to disk instead of building the sheet in memory. The header
+    is bold and frozen, cells wrap, and column widths are sized from the
+    first XLSX_WIDTH_SAMPLE rows.
+    """
+    try:
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+        from openpyxl.utils import get_column_letter
+    except ImportError as e:
+        raise RuntimeError("xlsx export requires openpyxl (pip install openpyxl)") from e
+
+    rows = iter(rows)
+    sample = list(itertools.islice(rows, XLSX_WIDTH_SAMPLE))
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("RFI Export")
+    ws.freeze_panes = "A2"
+    for index, (key, header) in enumerate(zip(fields, headers), start=1):
+        ws.column_dimensions[get_column_letter(index)].width = _column_width(header, sample, key)
+
+    wrap = Alignment(wrap_text=True, vertical="top")
+    bold = Font(bold=True)
+    fill = PatternFill("solid", fgColor="FFF8FAFC")
+    border = Border(bottom=Side(style="thin", color="FFE2E8F0"))
+
+    def header_cell(value):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font, cell.fill, cell.border = bold, fill, border
+        cell.alignment = Alignment(vertical="center")
+        return cell
+
+    def data_cell(value):
+        cell = WriteOnlyCell(ws, value=cell_value(value))
+        cell.alignment = wrap
+        return cell
+
+    ws.append([header_cell(header) for header in headers])
+    for row in itertools.chain(sample, rows):
+        ws.append([data_cell(row.get(key)) for key in fields])
+    wb.save(path)
+    return path
+
+
+def iter_xlsx(rows: Iterable[Dict[str, Any]], fields: List[str], headers: List[str]) -> Iterator[bytes]:
+    "Build the workbook in a temp file, then stream it back and remove it"
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        write_xlsx(rows, fields, headers, path)
+        with open(path, "rb") as f:
+            while chunk := f.read(FILE_CHUNK_SIZE):
+                yield chunk
+    finally:
+        os.remove(path)
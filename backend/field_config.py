@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from backend.metrics import rows, stage_seconds
+
+logger = logging.getLogger(__name__)
+
+FIELD_LIST_PATH = Path(__file__).resolve().parent / "userInput" / "fieldList.json"
+# How often (seconds) the file's mtime is re-checked
+RELOAD_CHECK_INTERVAL = float(os.getenv("FIELD_LIST_CHECK_INTERVAL", 1.0))
+
+
+class FieldList:
+    """
+    Parsed userInput/fieldList.json, re-read only when the file's mtime
+    changes. `version` increases on every reload so dependants can rebuild
+    derived data.
+    """
+
+    def __init__(self, path: Path = FIELD_LIST_PATH, check_interval: float = RELOAD_CHECK_INTERVAL):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self.version = 0
+        self._data: Optional[Dict[str, Any]] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._payload: Optional[Tuple[int, bytes, str]] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        if self._data is not None and now - self._checked_at < self.check_interval:
+            return self._data
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime
+            if self._data is None or mtime != self._mtime:
+                with open(self.path, "r") as f:
+                    self._data = json.load(f)
+                self._mtime = mtime
+                self.version += 1
+                logger.info(f"[FieldList] Loaded {self.path.name} (version {self.version})")
+            self._checked_at = now
+            return self._data
+
+    @property
+    def groups(self) -> List[Dict[str, Any]]:
+        return self.load()["groups"]
+
+    @property
+    def custom_groups(self) -> Dict[str, Any]:
+        return self.load()["custom_groups"]
+
+    def attributes_payload(self) -> Tuple[bytes, str]:
+        """
+        Return the /api/rfis/attributes body as pre-serialized JSON bytes and
+        its ETag. Both are rebuilt only when the file changes.
+        """
+        groups = self.groups
+        payload = self._payload
+        if payload is None or payload[0] != self.version:
+            body = json.dumps({"attributes": groups}).encode("utf-8")
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            payload = self._payload = (self.version, body, etag)
+        return payload[1], payload[2]
+
+
+class CustomAttributeDecoder:
+    """
+    Flattens an RFI's `customAttributes` list into top-level keys. Option IDs
+    are translated to labels through a flat (attr_id, option_id) -> label map
+    compiled from fieldList.json and rebuilt when the file changes. Option IDs
+    missing from the map keep their raw value and are counted in `unknown`.
+    """
+
+    def __init__(self, field_list: FieldList):
+        self.field_list = field_list
+        self.unknown: Counter = Counter()
+        self._compiled: Tuple[Dict[Tuple[str, str], str], frozenset] = ({}, frozenset())
+        self._version = -1
+
+    def compile(self):
+        "Build the label map, or rebuild it if fieldList.json changed"
+        custom_groups = self.field_list.custom_groups
+        if self.field_list.version == self._version:
+            return
+        labels = {
+            (attr_id, option_id): label
+            for attr_id, group in custom_groups.items()
+            for option_id, label in (group.get("options") or {}).items()
+        }
+        self._compiled = (labels, frozenset(custom_groups))
+        self._version = self.field_list.version
+
+    def _decode(self, rfi: Dict[str, Any]) -> Dict[str, Any]:
+        labels, mapped = self._compiled
+        for attr in rfi.pop("customAttributes", None) or []:
+            attr_id = attr.get("id")
+            values = attr.get("values")
+            if not attr_id or not values:
+                continue
+            value = values[0]
+            if attr_id in mapped:
+                label = labels.get((attr_id, value))
+                if label is None:
+                    if not self.unknown[(attr_id, value)]:
+                        logger.warning(f"[CustomAttributeDecoder] Unknown option {value} for attribute {attr_id}")
+                    self.unknown[(attr_id, value)] += 1
+                    label = value
+                value = label
+            rfi[attr_id] = value
+        return rfi
+
+    def decode(self, rfi: Dict[str, Any]) -> Dict[str, Any]:
+        "Flatten one RFI in place and return it"
+        start = time.perf_counter()
+        self.compile()
+        rfi = self._decode(rfi)
+        stage_seconds.observe(time.perf_counter() - start, "flatten")
+        rows.inc("flatten")
+        return rfi
+
+    def decode_many(self, rfis: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        "Flatten a batch of RFIs in place with a single freshness check"
+        start = time.perf_counter()
+        self.compile()
+        decoded = [self._decode(rfi) for rfi in rfis]
+        stage_seconds.observe(time.perf_counter() - start, "flatten_batch")
+        rows.inc("flatten", amount=len(decoded))
+        return decoded
+
+
+field_list = FieldList()
+custom_decoder = CustomAttributeDecoder(field_list)
@@ -0,0 +1,245 @@
+"""
+An embedded stand-in for Redis, used when REDIS_URL is not set (the desktop
+build, offline use). It implements the part of the redis-py client this
+backend calls: strings with expiry, MGET, pipelines, in-process pub/sub and
+locks. Values are kept in a SQLite file so tokens and caches survive a
+restart, or only in memory when the path is ":memory:".
+"""
+import contextlib
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MEMORY = ":memory:"
+# Seconds between sweeps of expired keys that nobody reads any more
+PURGE_INTERVAL = 60
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return str(value)
+
+
+class LocalLock:
+    "redis-py Lock interface over a threading.Lock; the store is one process, so `timeout` is not needed"
+
+    def __init__(self, lock: threading.Lock):
+        self._lock = lock
+
+    def acquire(self, blocking: bool = True, blocking_timeout: Optional[float] = None) -> bool:
+        if not blocking:
+            return self._lock.acquire(blocking=False)
+        return self._lock.acquire(timeout=-1 if blocking_timeout is None else blocking_timeout)
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class LocalPubSub:
+    "Messages published in this process, delivered through get_message like redis-py's PubSub"
+
+    def __init__(self, store: "LocalStore"):
+        self._store = store
+        self._messages: "queue.Queue[dict]" = queue.Queue()
+        self.channels: set = set()
+
+    def subscribe(self, *channels: str):
+        self.channels.update(channels)
+        self._store._subscribe(self)
+
+    def deliver(self, channel: str, data: str):
+        if channel in self.channels:
+            self._messages.put({"type": "message", "channel": channel, "data": data, "pattern": None})
+
+    def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0) -> Optional[dict]:
+        try:
+            return self._messages.get(timeout=timeout) if timeout else self._messages.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._store._unsubscribe(self)
+        self.channels.clear()
+
+
+class LocalPipeline:
+    "Queued commands run in one SQLite transaction on execute()"
+
+    def __init__(self, store: "LocalStore"):
+        self._store = store
+        self._commands: List[tuple] = []
+
+    def __getattr__(self, name: str):
+        if name not in LocalStore.PIPELINE_COMMANDS:
+            raise AttributeError(name)
+
+        def queue_command(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue_command
+
+    def execute(self, raise_on_error: bool = True) -> List[Any]:
+        commands, self._commands = self._commands, []
+        results = []
+        with self._store._transaction():
+            for name, args, kwargs in commands:
+                try:
+                    results.append(getattr(self._store, name)(*args, **kwargs))
+                except Exception as e:
+                    results.append(e)
+        if raise_on_error:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._commands = []
+
+
+class LocalStore:
+    """
+    Strings with optional expiry in one SQLite table. Expired keys are
+    deleted when read, at startup, and by a sweep run from set() at most
+    every PURGE_INTERVAL seconds. All access goes through one lock; a
+    write is a single-row statement, so this is fast enough for one user's
+    sessions and caches.
+    """
+
+    PIPELINE_COMMANDS = ("get", "mget", "pttl", "set", "setex", "delete", "publish")
+
+    def __init__(self, path: str = MEMORY):
+        self.path = path
+        if path != MEMORY:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self._subscribers: List[LocalPubSub] = []
+        self._locks: Dict[str, threading.Lock] = {}
+        self._purged_at = 0.0
+        with self._lock:
+            if path != MEMORY:
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)")
+            self._purge(time.time())
+        logger.info(f"[LocalStore] Using {'in-memory store' if path == MEMORY else path} instead of Redis")
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                yield
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _purge(self, now: float):
+        "Delete every expired key; caller holds the lock"
+        self._db.execute("DELETE FROM kv WHERE expires_at <= ?", (now,))
+        self._purged_at = now
+
+    def ping(self) -> bool:
+        return True
+
+    def get(self, key: str) -> Optional[str]:
+        return self.mget([key])[0]
+
+    def mget(self, keys, *args) -> List[Optional[str]]:
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        keys.extend(args)
+        if not keys:
+            return []
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT key, value, expires_at FROM kv WHERE key IN ({','.join('?' * len(keys))})", keys
+            ).fetchall()
+            expired = [key for key, _, expires_at in rows if expires_at is not None and expires_at <= now]
+            if expired:
+                self._db.execute(
+                    f"DELETE FROM kv WHERE key IN ({','.join('?' * len(expired))}) AND expires_at <= ?", (*expired, now)
+                )
+        found = {key: value for key, value, expires_at in rows if expires_at is None or expires_at > now}
+        return [found.get(key) for key in keys]
+
+    def pttl(self, key: str) -> int:
+        "Milliseconds until `key` expires; -1 without an expiry, -2 if it does not exist"
+        with self._lock:
+            row = self._db.execute("SELECT expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return -2
+        if row[0] is None:
+            return -1
+        remaining = int((row[0] - time.time()) * 1000)
+        return remaining if remaining > 0 else -2
+
+    def set(self, key: str, value: Any, ex: Optional[float] = None) -> bool:
+        now = time.time()
+        expires_at = now + ex if ex else None
+        with self._lock:
+            if now - self._purged_at >= PURGE_INTERVAL:
+                self._purge(now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)", (key, _text(value), expires_at)
+            )
+        return True
+
+    def setex(self, key: str, ttl: float, value: Any) -> bool:
+        return self.set(key, value, ex=ttl)
+
+    def delete(self, *keys: str) -> int:
+        if not keys:
+            return 0
+        with self._lock:
+            return self._db.execute(f"DELETE FROM kv WHERE key IN ({','.join('?' * len(keys))})", keys).rowcount
+
+    def pipeline(self, transaction: bool = True) -> LocalPipeline:
+        return LocalPipeline(self)
+
+    def publish(self, channel: str, message: Any) -> int:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.deliver(channel, _text(message))
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> LocalPubSub:
+        return LocalPubSub(self)
+
+    def _subscribe(self, pubsub: LocalPubSub):
+        with self._lock:
+            if pubsub not in self._subscribers:
+                self._subscribers.append(pubsub)
+
+    def _unsubscribe(self, pubsub: LocalPubSub):
+        with self._lock:
+            if pubsub in self._subscribers:
+                self._subscribers.remove(pubsub)
+
+    def lock(self, name: str, timeout: Optional[float] = None) -> LocalLock:
+        with self._lock:
+            return LocalLock(self._locks.setdefault(name, threading.Lock()))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,17 +1,120 @@
-from backend.api import API
-from bottle import Bottle, run, request, response, redirect
+from backend import token_store
+from backend.api import config_keys
+from backend.coalesce import SingleFlight
+from backend.export import content_disposition, export_filename, format_rows, iter_csv, iter_xlsx
+from backend.field_config import custom_decoder, field_list
+from backend import metrics, profiling
+from backend.platforms.acc.rfis import hydrate_rfis
+from backend.rfi_cache import rfi_cache
+from backend.redis_client import redis_client
+from backend.serve import ready, serve
+from backend.sessions import sessions
+from bottle import Bottle, HTTPResponse, request, response, redirect
 #from backend.cors import enable_cors
 import json
+import logging
 import os
 import uuid
 import re
-from pathlib import Path
+import time
 
 from dotenv import load_dotenv
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Build rows from the search:rfis projection instead of one GET per RFI
+SEARCH_PROJECTION = os.getenv("ACC_SEARCH_PROJECTION", "1") != "0"
+rfi_queries = SingleFlight()
+metrics.registry.collected(
+    "rfi_query_coalescing_total", "Table loads run, joined to an in-flight load, or served from a recent result",
+    lambda: dict(rfi_queries.counters), ["event"], kind="counter"
+)
+
 app = Bottle()
-api = API()
+
+
+class MetricsPlugin:
+    "Record latency and status per route; exceptions count as 500"
+    name = "metrics"
+    api = 2
+
+    def apply(self, callback, route):
+        method, rule = route.method, route.rule
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            status = 500
+            try:
+                out = callback(*args, **kwargs)
+                status = response.status_code
+                return out
+            except HTTPResponse as e:
+                status = e.status_code
+                raise
+            finally:
+                metrics.http_request_seconds.observe(time.perf_counter() - start, method, rule)
+                metrics.http_responses.inc(method, rule, str(status))
+        return wrapper
+
+
+class ProfilePlugin:
+    """
+    Time each request's phases into a Server-Timing header, and run the
+    sampling profiler when asked (X-Profile header or PROFILE_REQUESTS),
+    keeping profiles of requests slower than PROFILE_THRESHOLD_MS.
+    Dict results are serialized here so encoding shows up as a phase.
+    """
+    name = "profile"
+    api = 2
+
+    def apply(self, callback, route):
+        rule = route.rule
+
+        def wrapper(*args, **kwargs):
+            sampler = None
+            if profiling.profile_requested(request.headers.get(profiling.PROFILE_HEADER)):
+                sampler = profiling.Sampler().start()
+            with profiling.request_timings() as timings:
+                try:
+                    out = callback(*args, **kwargs)
+                    if isinstance(out, dict):
+                        with timings.phase("serialize"):
+                            out = json.dumps(out)
+                        response.content_type = "application/json"
+                finally:
+                    elapsed = timings.elapsed()
+                    if sampler is not None:
+                        sampler.stop()
+                        if elapsed * 1000 >= profiling.PROFILE_THRESHOLD_MS:
+                            path = profiling.save(sampler, rule, elapsed)
+                            if path:
+                                response.set_header("X-Profile-File", os.path.basename(path))
+                    if profiling.SERVER_TIMING and timings.phases:
+                        response.set_header("Server-Timing", timings.header())
+            return out
+        return wrapper
+
+
+class PrefetchPlugin:
+    """
+    Answer a request's token_store reads (the session's tokens, field and
+    increment configs) with one Redis round-trip; see token_store.prefetch.
+    """
+    name = "prefetch"
+    api = 2
+
+    def apply(self, callback, route):
+        def wrapper(*args, **kwargs):
+            session_id = request.headers.get("X-Session-Id") or "global"
+            with token_store.prefetch(session_id, config_keys(session_id)):
+                return callback(*args, **kwargs)
+        return wrapper
+
+
+app.install(MetricsPlugin())
+app.install(ProfilePlugin())
+app.install(PrefetchPlugin())
 
 @app.hook('after_request')
 def add_cors_headers():
@@ -21,6 +124,7 @@ def add_cors_headers():
     response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
     response.headers["Access-Control-Allow-Headers"] = "Origin, Content-Type, Accept, X-Session-Id"
     response.headers["Access-Control-Allow-Credentials"] = "true"
+    response.headers["Access-Control-Expose-Headers"] = "Server-Timing, X-Profile-File"
 
 @app.error(500)
 def error500(error):
@@ -39,7 +143,7 @@ def options_handler(path):
 def login():
     session_id = "global"
     # Create empty session in Redis
-    api.client.set_session(session_id)
+    api = sessions.get(session_id)
     result = api.login(session_id)
     if result.get("status") == "ok":
         return redirect(f"{os.getenv('FRONTEND_URL')}?session_id={session_id}")
@@ -48,7 +152,7 @@ def login():
 @app.get("/callback")
 def callback():
     session_id = "global"
-    api.client.set_session(session_id)
+    api = sessions.get(session_id)
     api.client.handle_callback(request.query.code)
     return redirect(f"{os.getenv('FRONTEND_URL')}?session_id={session_id}")
 
@@ -56,74 +160,142 @@ def callback():
 def logout():
     session_id = request.headers.get("X-Session-Id")
     if session_id:
-        api.client.set_session(session_id)
+        api = sessions.get(session_id)
         api.client.clear_tokens()
+        sessions.discard(session_id)
     return {"status": "logged_out"}
 
 @app.get("/api/auth/status")
 def auth_status():
     session_id = request.headers.get("X-Session-Id") or "global"
-    api.client.set_session(session_id)
+    api = sessions.get(session_id)
     tokens = api.client.load_tokens()
     return {"logged_in": bool(tokens)}
 
+# Compile the custom attribute labels once at startup
+custom_decoder.compile()
+
 def get_custom_mapping():
-    field_list_path = Path(__file__).parent / "userInput" / "fieldList.json"
-    with open(field_list_path, "r") as f:
-        field_list = json.load(f)
-    return field_list["custom_groups"]
+    return field_list.custom_groups
 
 
 def flatten_custom_attributes(rfi: dict) -> dict:
-    custom_attrs = rfi.pop("customAttributes", [])
-
-    for attr in custom_attrs:
-        attr_id = attr.get("id")
-        values = attr.get("values", [])
-        if attr_id and values:
-            if attr_id in get_custom_mapping():
-                rfi[attr_id] = get_custom_mapping()[attr_id]["options"][values[0]]
-            else:
-                rfi[attr_id] = values[0]
-    return rfi
+    return custom_decoder.decode(rfi)
 
 @app.post("/api/rfis")
 def get_rfis():
     session_id = request.headers.get("X-Session-Id") or "global"
-    api.client.set_session(session_id)
+    api = sessions.get(session_id)
 
     filters = request.json or {}
-    items = api.get_rfis(filters)
     desired_fields = filters.get("fields", None)
+    desired_fields = list(set((desired_fields or []) + ["id", "customIdentifier", "title", "status"]))
+
+    def load():
+        if SEARCH_PROJECTION:
+            return api.get_rfi_rows(filters, desired_fields, transform=flatten_custom_attributes)
+        with profiling.phase("search"):
+            versions = api.get_rfi_versions(filters)
+        # Flattening runs inside the hydration workers here, so it counts as hydrate
+        with profiling.phase("hydrate"):
+            return hydrate_rfis(api.client, list(versions), versions=versions, transform=flatten_custom_attributes)
 
-    full = []
-    for rfi_id in items:
-        try:
-            full.append(flatten_custom_attributes(api.client.get_rfi_by_id(rfi_id)))
-        except Exception as e:
-            continue
+    # Identical loads running at the same time share one set of ACC calls
+    hydrated, _ = rfi_queries.do(api.rfi_query_key(filters, desired_fields), load)
+    full = hydrated.items
     def pick_fields(obj: dict, desired: list[str]) -> dict:
         out = {}
         for key in desired:
             out[key] = obj.get(key)
         return out
     
-    desired_fields = list(set(desired_fields + ["id", "customIdentifier", "title", "status"]))
     rows = [pick_fields(rfi, desired_fields) for rfi in full]
-    results = {r["customIdentifier"]: r for r in rows}
-    return {"items": rows}
+    return {"items": rows, "failed": hydrated.failed}
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", iter_csv),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", iter_xlsx),
+}
+
+@app.route("/api/rfis/export", method=["GET", "POST"])
+def export_rfis():
+    """
+    Stream the RFI table as CSV (default) or xlsx while rows are fetched from ACC.
+    POST takes the /api/rfis body plus "format", "filename" and optionally
+    "columns" and "userMap". GET takes the same JSON in ?q=. The session
+    always comes from the X-Session-Id header, never the URL, so it stays out
+    of access logs and browser history.
+    """
+    session_id = request.headers.get("X-Session-Id") or "global"
+    api = sessions.get(session_id)
+
+    if request.method == "POST":
+        filters = request.json or {}
+    else:
+        filters = json.loads(request.query.get("q") or "{}")
+
+    fmt = filters.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        response.status = 400
+        return {"error": f"Unsupported export format: {fmt}"}
+    content_type, encode = EXPORT_FORMATS[fmt]
+
+    # "columns" ([{key, label, type}]) and "userMap" render cells the way the table shows them
+    columns = filters.get("columns") or []
+    if columns:
+        fields = list(dict.fromkeys(column["key"] for column in columns))
+        labels = {column["key"]: column.get("label") or column["key"] for column in columns}
+    else:
+        fields = list(dict.fromkeys((filters.get("fields") or []) or ["customIdentifier", "title", "status"]))
+        labels = {group["key"]: group.get("label", group["key"]) for group in field_list.groups}
+    headers = [labels.get(key, key) for key in fields]
+    filename = export_filename(filters.get("filename"), fmt)
+
+    rows = api.iter_table_rows(filters, fields, transform=flatten_custom_attributes)
+    if columns:
+        types = {column["key"]: column.get("type") for column in columns}
+        rows = format_rows(rows, fields, types, filters.get("userMap"))
+    response.content_type = content_type
+    response.set_header("Content-Disposition", content_disposition(filename))
+    return encode(rows, fields, headers)
+
+@app.get("/api/ready")
+def readiness():
+    "503 while the worker is starting or draining, or when Redis is unreachable"
+    checks = {"serving": ready.is_set(), "redis": True}
+    try:
+        redis_client.ping()
+    except Exception as e:
+        logger.warning(f"[readiness] Redis ping failed: {e}")
+        checks["redis"] = False
+    if not all(checks.values()):
+        response.status = 503
+    return {"ready": all(checks.values()), "checks": checks}
+
+@app.get("/api/metrics")
+def get_metrics():
+    response.content_type = metrics.CONTENT_TYPE
+    return metrics.render()
+
+@app.get("/api/rfis/cache")
+def get_rfi_cache_stats():
+    return {**rfi_cache.stats(), "queries": rfi_queries.stats()}
 
 @app.get("/api/rfis/attributes")
 def get_rfi_attributes():
-    session_id = request.headers.get("X-Session-Id") or "global"
-    api.client.set_session(session_id)
-    attributes = api.get_rfi_attributes()
-    return {"attributes": attributes}
+    body, etag = field_list.attributes_payload()
+    response.set_header("ETag", etag)
+    response.set_header("Cache-Control", "no-cache")
+    if etag in request.headers.get("If-None-Match", ""):
+        response.status = 304
+        return b""
+    response.content_type = "application/json"
+    return body
 
 @app.get("/api/config/fields")
 def get_field_config():
     session_id = request.headers.get("X-Session-Id") or "global"
-    api.client.set_session(session_id)
+    api = sessions.get(session_id)
     try:
         config = api.get_field_config()
     except Exception as e:
@@ -134,19 +306,59 @@ def get_field_config():
 @app.post("/api/acc/signed-download")
 def signed_download():
     session_id = request.headers.get("X-Session-Id") or "global"
-    api.client.set_session(session_id)
+    api = sessions.get(session_id)
 
     body = request.json or {}
     storage_urn = (body.get("storageUrn") or "").strip()
-    # TODO: implement signed download
-    print(storage_urn)
-    return {"status": "ok"}
+    if not storage_urn:
+        response.status = 400
+        return {"error": "storageUrn is required"}
+    try:
+        url = api.get_signed_download_url(storage_urn)
+    except ValueError as e:
+        response.status = 400
+        return {"error": str(e)}
+    return {"url": url}
+
+def download_folder(subfolder: str | None) -> str:
+    "DOWNLOAD_DIR, or a folder inside it; raises ValueError for a path that leaves it"
+    base = os.path.realpath(os.getenv("DOWNLOAD_DIR", "downloads"))
+    folder = os.path.realpath(os.path.join(base, subfolder or ""))
+    if os.path.isabs(subfolder or "") or os.path.commonpath([base, folder]) != base:
+        raise ValueError("folder must be a relative path inside the download directory")
+    return folder
+
+@app.post("/api/rfis/attachments/download")
+def download_attachments():
+    """
+    Download all attachments of the RFIs matching the /api/rfis body into
+    DOWNLOAD_DIR (default ./downloads), or the relative subfolder of it
+    given as body "folder".
+    """
+    session_id = request.headers.get("X-Session-Id") or "global"
+    api = sessions.get(session_id)
+
+    filters = request.json or {}
+    try:
+        folder = download_folder(filters.get("folder"))
+    except ValueError as e:
+        response.status = 400
+        return {"error": str(e)}
+    report = api.download_attachments(filters, folder)
+    return {
+        "folder": folder,
+        "completed": len(report.completed),
+        "reused": report.reused,
+        "failed": report.failed,
+        "bytes": report.bytes_downloaded,
+        "failures": report.failures,
+    }
 
 
 @app.post("/api/config/fields")
 def save_field_config():
     session_id = request.headers.get("X-Session-Id") or "global"
-    api.client.set_session(session_id)
+    api = sessions.get(session_id)
     config = request.json or {}
     try:
         api.save_field_config(config)
@@ -162,7 +374,7 @@ def get_increment_configs():
     Returns: { "configs": { "INC 1": {...}, "INC 2": {...}, ... } }
     """
     session_id = request.headers.get("X-Session-Id") or "global"
-    api.client.set_session(session_id)
+    api = sessions.get(session_id)
     try:
         configs = api.get_increment_configs()
         return configs
@@ -177,7 +389,7 @@ def save_increment_configs():
     Body: { "configs": { "INC 1": { "searchTerm": "", "fields": [...] }, ... } }
     """
     session_id = request.headers.get("X-Session-Id") or "global"
-    api.client.set_session(session_id)
+    api = sessions.get(session_id)
     body = request.json or {}
     try:
         configs = body.get("configs", {})
@@ -188,8 +400,5 @@ def save_increment_configs():
         return {"error": str(e)}, 500
 
 if __name__ == "__main__":
-    run(
-        app, 
-        host="0.0.0.0", 
-        port=int(os.getenv("PORT", 8000))
-    )
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO)
+    serve(app)
\ No newline at end of file
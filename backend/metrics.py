@@ -0,0 +1,219 @@
+"""
+In-process counters and latency histograms, rendered in the Prometheus text
+format at /api/metrics. Recording is a dict lookup and a few additions under
+a lock, so instrumentation stays on in production. Each worker process keeps
+its own numbers; scrape every worker (or sum them) for the whole service.
+"""
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+# Upper bounds (seconds) for latency histograms: sub-millisecond cache and Redis calls to slow ACC pages
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def lines(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(v)}" for labels, v in values]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (last is +Inf)], sum, count
+        self._values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        if not METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str):
+        "Observe how long the block took"
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            values = sorted((labels, (list(e[0]), e[1], e[2])) for labels, e in self._values.items())
+        out = []
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return out
+
+
+class Collected(_Metric):
+    """
+    Values read at scrape time from a callback returning {label value: number}
+    (or a plain number when there are no labels), for state that already has
+    its own counters such as cache stats.
+    """
+
+    def __init__(self, name: str, help: str, collect: Callable[[], object], labelnames: Iterable[str] = (), kind: str = "gauge"):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+        self.kind = kind
+
+    def lines(self) -> List[str]:
+        try:
+            values = self.collect()
+        except Exception as e:
+            logger.debug(f"[metrics] Collecting {self.name} failed: {e}")
+            return []
+        if not isinstance(values, dict):
+            return [f"{self.name} {_number(values)}"]
+        out = []
+        for labels, value in sorted(values.items()):
+            labels = labels if isinstance(labels, tuple) else (labels,)
+            out.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # Re-registering (e.g. a module reloaded under `python -m`) keeps the first
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def collected(self, name: str, help: str, collect: Callable[[], object], labelnames: Iterable[str] = (), kind: str = "gauge") -> Collected:
+        return self.register(Collected(name, help, collect, labelnames, kind))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        out: List[str] = []
+        for metric in metrics:
+            lines = metric.lines()
+            if lines:
+                out.extend(metric.header())
+                out.extend(lines)
+        return "\n".join(out) + "\n"
+
+
+registry = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ACC calls, by endpoint family (see rate_limit.endpoint_family)
+acc_request_seconds = registry.histogram(
+    "acc_request_seconds", "ACC API request latency, including rate-limit waits and retries", ["family", "method"]
+)
+acc_responses = registry.counter("acc_responses_total", "ACC API responses by final status code", ["family", "status"])
+acc_retries = registry.counter("acc_retries_total", "ACC API requests sent again", ["family", "reason"])
+
+# Backend hot paths
+stage_seconds = registry.histogram("backend_stage_seconds", "Time spent in backend hot paths", ["stage"])
+rows = registry.counter("backend_rows_total", "Rows produced by backend stages", ["stage"])
+token_store_seconds = registry.histogram("token_store_seconds", "token_store call latency", ["op"])
+token_cache_lookups = registry.counter("token_cache_lookups_total", "In-process token cache lookups", ["result"])
+
+# HTTP server
+http_request_seconds = registry.histogram("http_request_seconds", "Backend request latency by route", ["method", "route"])
+http_responses = registry.counter("http_responses_total", "Backend responses by route and status", ["method", "route", "status"])
+
+
+def timed(histogram: Histogram, *labels: str):
+    "Decorator form of Histogram.time"
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, *labels)
+        return wrapper
+    return decorate
+
+
+def render() -> str:
+    return registry.render()
@@ -0,0 +1,190 @@
+# asyncio counterpart of Client for the ASGI app, on a shared HTTP/2-capable httpx pool.
+import asyncio
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+from urllib.parse import quote
+
+import httpx
+
+from backend.platforms.acc.client import (
+    CONNECT_TIMEOUT,
+    HTTP_RETRIES,
+    READ_TIMEOUT,
+    RETRY_STATUSES,
+    TOKEN_REFRESH_MARGIN,
+    Client,
+    backoff_delay,
+    parse_storage_urn,
+)
+from backend.metrics import acc_request_seconds, acc_responses, acc_retries
+from backend.platforms.acc.rate_limit import endpoint_family, rate_limiter, retry_after
+from backend.rfi_cache import rfi_cache
+from backend.signed_url_cache import SIGNED_URL_MINUTES, signed_url_cache, url_expiry
+
+logger = logging.getLogger(__name__)
+
+# Open connections are cheap without a thread each; over HTTP/2 they also multiplex many streams
+ASYNC_POOL_SIZE = int(os.getenv("ACC_ASYNC_POOL_SIZE", 128))
+
+
+def build_async_http(pool_size: int = ASYNC_POOL_SIZE) -> httpx.AsyncClient:
+    """
+    Create the shared httpx.AsyncClient. HTTP/2 is negotiated over TLS when
+    the server supports it, so many concurrent calls share a few connections.
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+    )
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    "Retry-After when the server sends it, else exponential backoff plus jitter"
+    delay = retry_after(response)
+    return backoff_delay(attempt) if delay is None else delay
+
+
+class AsyncClient:
+    """
+    Async ACC calls for one session. Session, project and token state stay
+    on the wrapped synchronous Client; token refreshes are rare and take
+    Redis locks, so they run on a worker thread through that Client.
+    """
+
+    def __init__(self, auth: Client, http: httpx.AsyncClient):
+        self.auth = auth
+        self.http = http
+
+    @property
+    def project_id(self) -> str:
+        return self.auth.project_id
+
+    @property
+    def user_id(self) -> Optional[List[str]]:
+        return self.auth.user_id
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return self.auth.headers
+
+    async def _ensure_fresh_token(self):
+        auth = self.auth
+        if auth.access_token and auth.expires_at - TOKEN_REFRESH_MARGIN > time.time():
+            return
+        await asyncio.to_thread(auth._ensure_fresh_token)
+
+    async def _send(self, method: str, path: str, *, params=None, json_body=None) -> httpx.Response:
+        "Client._send plus the 5xx retries the sync HTTP adapter does"
+        url = self.auth._url(path)
+        family = endpoint_family(path)
+        start = time.perf_counter()
+        for attempt in range(HTTP_RETRIES + 1):
+            await rate_limiter.acquire_async(family)
+            r = await self.http.request(method, url, headers=self.headers, params=params, json=json_body)
+            await rate_limiter.observe_async(family, r, backoff=backoff_delay(attempt))
+            if attempt == HTTP_RETRIES:
+                break
+            if r.status_code in RETRY_STATUSES:
+                acc_retries.inc(family, "5xx")
+                await asyncio.sleep(_retry_delay(r, attempt))
+            elif r.status_code == 429:
+                acc_retries.inc(family, "429")
+            else:
+                break
+        acc_request_seconds.observe(time.perf_counter() - start, family, method)
+        acc_responses.inc(family, str(r.status_code))
+        return r
+
+    async def _request_with_auto_refresh(self, method: str, path: str, *, params=None, json_body=None) -> httpx.Response:
+        await self._ensure_fresh_token()
+        r = await self._send(method, path, params=params, json_body=json_body)
+        if r.status_code == 401:
+            if await asyncio.to_thread(self.auth._refresh_tokens, stale_token=self.auth.access_token):
+                acc_retries.inc(endpoint_family(path), "401")
+                r = await self._send(method, path, params=params, json_body=json_body)
+        return r
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        r = await self._request_with_auto_refresh("GET", path, params=params)
+        if r.status_code != 200:
+            logger.error(f"GET failed with status code {r.status_code}: {r.text}")
+            raise Exception(f"GET failed with status code {r.status_code}")
+        return r.json()
+
+    async def post(self, path: str, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        r = await self._request_with_auto_refresh("POST", path, json_body=body)
+        if r.status_code != 200:
+            logger.error(f"POST failed with status code {r.status_code}: {r.text}")
+            raise Exception(f"POST failed with status code {r.status_code}")
+        return r.json()
+
+    #----------------------------------------------------
+    #             ACC API helpers
+    #----------------------------------------------------
+    async def get_user_id(self) -> str:
+        path = f"construction/rfis/v3/projects/{self.project_id}/users/me"
+        response = await self.get(path=path)
+        return response["user"]["id"]
+
+    async def ensure_user(self):
+        if not self.auth.user_id:
+            self.auth.user_id = [await self.get_user_id()]
+
+    async def search_rfis(self, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        path = f"construction/rfis/v3/projects/{self.project_id}/search:rfis"
+        try:
+            return await self.post(path=path, body=body)
+        except Exception as e:
+            logger.error(f"[AsyncClient] Search RFIs failed with error: {e}")
+            raise
+
+    async def iter_search_pages(self, body: Optional[Dict[str, Any]] = None, *, prefetch: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        "Async version of Client.iter_search_pages; prefetch runs the next page as a task"
+        body = dict(body or {})
+        offset = body.get("offset") or 0
+        page = await self.search_rfis(body={**body, "offset": offset})
+        pending = None
+        try:
+            while True:
+                results = page.get("results", [])
+                total = page.get("pagination", {}).get("totalResults", 0)
+                offset += len(results)
+                has_next = bool(results) and offset < total
+                if prefetch and has_next:
+                    pending = asyncio.create_task(self.search_rfis(body={**body, "offset": offset}))
+                yield page
+                if not has_next:
+                    return
+                page = await pending if pending else await self.search_rfis(body={**body, "offset": offset})
+                pending = None
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def get_rfi_by_id(self, rfi_id: str, updated_at: Optional[str] = None) -> dict:
+        "Fetch one RFI, served from rfi_cache unless it changed since `updated_at`"
+        rfi = await rfi_cache.get_async(self.project_id, rfi_id, updated_at=updated_at)
+        if rfi is None:
+            rfi = await self.get(path=f"construction/rfis/v3/projects/{self.project_id}/rfis/{rfi_id}")
+            await rfi_cache.set_async(self.project_id, rfi_id, rfi)
+        return rfi
+
+    async def get_signed_download(self, storage_urn: str) -> str:
+        "Signed S3 download URL for a storage URN, reusing a cached one while it is valid"
+        # Cached URLs are shared by the project's sessions; users/me confirms this one is a member
+        await self.ensure_user()
+        url = await signed_url_cache.get_async(self.project_id, storage_urn)
+        if url:
+            return url
+        bucket, object_key = parse_storage_urn(storage_urn)
+        path = f"oss/v2/buckets/{bucket}/objects/{quote(object_key, safe='')}/signeds3download"
+        requested_at = time.time()
+        response = await self.get(path=path, params={"minutesExpiration": SIGNED_URL_MINUTES})
+        url = response.get("url")
+        if not url:
+            raise Exception(f"No signed URL returned for {storage_urn}")
+        await signed_url_cache.set_async(self.project_id, storage_urn, url, url_expiry(url, requested_at))
+        return url
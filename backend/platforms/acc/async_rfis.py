@@ -0,0 +1,120 @@
+# Async RFI search and hydration for the ASGI app; request bodies come from rfis.py.
+import asyncio
+import logging
+import os
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+
+from backend.metrics import rows, stage_seconds
+from backend.platforms.acc.async_client import AsyncClient
+from backend.platforms.acc.rfis import (
+    DETAIL_ONLY_FIELDS,
+    OPEN_STATUSES,
+    SEARCH_PREFETCH,
+    HydrationResult,
+    create_date_range,
+    search_body,
+    search_projection,
+)
+
+logger = logging.getLogger(__name__)
+
+# Concurrent per-RFI GETs per table load; they are coroutines, not threads
+ASYNC_HYDRATE_CONCURRENCY = int(os.getenv("ACC_ASYNC_HYDRATE_CONCURRENCY", 32))
+
+
+async def iter_rfi_pages(
+    client: AsyncClient,
+    *,
+    search_text: Optional[str] = None,
+    updated_after: Optional[str] = None,
+    limit: int = 200,
+    fields: Optional[List[str]] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield pages of open RFIs assigned to the current user, like
+    rfis.iter_rfi_pages. The updatedAfter filter is always the single
+    updatedAt search (ACC never sets updatedAt before createdAt).
+    """
+    await client.ensure_user()
+    filters = {"status": OPEN_STATUSES, "assignedTo": client.user_id}
+    if updated_after:
+        filters["updatedAt"] = create_date_range(start=updated_after)
+    body = search_body(search_text=search_text, filters=filters, limit=limit, fields=fields)
+    async for page in client.iter_search_pages(body=body, prefetch=SEARCH_PREFETCH):
+        yield page.get("results", [])
+
+
+async def hydrate_rfis(
+    client: AsyncClient,
+    rfi_ids: List[str],
+    *,
+    versions: Optional[Dict[str, str]] = None,
+    concurrency: int = ASYNC_HYDRATE_CONCURRENCY
+) -> HydrationResult:
+    "Fetch full RFIs concurrently, at most `concurrency` at a time, keeping the order of rfi_ids"
+    versions = versions or {}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch(rfi_id: str):
+        async with semaphore:
+            try:
+                return await client.get_rfi_by_id(rfi_id, updated_at=versions.get(rfi_id)), None
+            except Exception as e:
+                return None, str(e) or e.__class__.__name__
+
+    result = HydrationResult()
+    with stage_seconds.time("hydrate"):
+        fetched = await asyncio.gather(*(fetch(rfi_id) for rfi_id in rfi_ids))
+    for rfi_id, (rfi, error) in zip(rfi_ids, fetched):
+        if error is None:
+            result.items.append(rfi)
+        else:
+            result.failures[rfi_id] = error
+    rows.inc("hydrate", amount=len(result.items))
+    if result.failures:
+        logger.warning(f"[hydrate_rfis] {result.failed}/{len(rfi_ids)} RFIs failed to load")
+    return result
+
+
+async def table_rows(
+    client: AsyncClient,
+    filters: Dict[str, Any],
+    desired_fields: List[str],
+    custom_fields: Set[str],
+    transform: Optional[Callable[[dict], dict]] = None
+) -> HydrationResult:
+    """
+    Async API.get_rfi_rows: rows from the search:rfis projection, with a GET
+    per RFI only for fields search cannot return.
+    """
+    result = HydrationResult()
+    projection = search_projection(desired_fields, custom_fields)
+    detail_fields = [f for f in desired_fields if f in DETAIL_ONLY_FIELDS]
+
+    pages = iter_rfi_pages(
+        client,
+        search_text=filters.get("searchText", " "),
+        updated_after=filters.get("updatedAfter"),
+        limit=filters.get("limit", 200),
+        fields=projection,
+    )
+    async for page in pages:
+        if detail_fields:
+            versions = {row.get("id"): row.get("updatedAt") for row in page}
+            hydrated = await hydrate_rfis(client, list(versions), versions=versions)
+            result.failures.update(hydrated.failures)
+            details = {rfi.get("id"): rfi for rfi in hydrated.items}
+            page = [row for row in page if row.get("id") in details]
+            for row in page:
+                for key in detail_fields:
+                    row[key] = details[row.get("id")].get(key)
+
+        for row in page:
+            if transform:
+                try:
+                    row = transform(row)
+                except Exception as e:
+                    result.failures[row.get("id")] = str(e) or e.__class__.__name__
+                    continue
+            result.items.append(row)
+    return result
@@ -0,0 +1,257 @@
+# Content-addressed local store for downloaded attachments, shared by every RFI folder.
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+BLOB_STORE_ENABLED = os.getenv("ACC_BLOB_STORE", "1") != "0"
+# Defaults to DOWNLOAD_DIR/.blobs, shared by every package downloaded into it and on
+# the same filesystem so hardlinks work
+BLOB_STORE_DIR = os.getenv("ACC_BLOB_STORE_DIR")
+BLOB_STORE_QUOTA = int(float(os.getenv("ACC_BLOB_STORE_QUOTA_MB", 5120)) * 1024 * 1024)
+INDEX_FILE = "index.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+LOCK_SUFFIX = ".lock"
+
+
+def _lock_file(f):
+    "Block until this process holds an exclusive OS lock on f; the OS drops it if the process dies"
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            # LK_LOCK gives up after about 10 seconds
+            continue
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    """
+    Attachments stored once under objects/<sha256[:2]>/<sha256>, with an
+    index mapping each storage URN (ACC gives every file version its own
+    object) to its content hash. Per-RFI folders get hardlinks into the
+    store, or copies where the filesystem cannot link. When the store grows
+    past `quota` bytes, the least recently used blobs are evicted. A blob
+    that is still hardlinked from an RFI folder is pinned: removing it would
+    free no disk, so it stays until those folders are deleted.
+    """
+
+    def __init__(self, root: str, quota: int = BLOB_STORE_QUOTA):
+        self.root = root
+        self.quota = quota
+        self.urns: Dict[str, str] = {}
+        self.blobs: Dict[str, Dict[str, Any]] = {}
+        self.total_bytes = 0
+        self._dirty = False
+        self._lock = threading.RLock()
+        # storage URN -> [lock, threads holding or waiting for it]
+        self._staging: Dict[str, list] = {}
+        self._load()
+
+    def _index_path(self) -> str:
+        return os.path.join(self.root, INDEX_FILE)
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.root, "objects", sha256[:2], sha256)
+
+    def staging_path(self, storage_urn: str) -> str:
+        "Stable download location for a URN, so an interrupted transfer can resume"
+        name = hashlib.sha1(storage_urn.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, "staging", name)
+
+    @contextlib.contextmanager
+    def staging(self, storage_urn: str) -> Iterator[str]:
+        """
+        Exclusive use of the URN's staging path while it is downloaded and
+        put(). Threads of this process queue on an in-process lock, and
+        other processes on an OS lock of a sibling .lock file. Two requests
+        that need one URN therefore never write the same .part file. The
+        caller should try link() again once inside.
+        """
+        with self._lock:
+            entry = self._staging.setdefault(storage_urn, [threading.Lock(), 0])
+            entry[1] += 1
+        path = self.staging_path(storage_urn)
+        try:
+            with entry[0]:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path + LOCK_SUFFIX, "a+b") as f:
+                    _lock_file(f)
+                    try:
+                        yield path
+                    finally:
+                        _unlock_file(f)
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._staging[storage_urn]
+
+    def _load(self):
+        try:
+            with open(self._index_path(), "r") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"[BlobStore] Ignoring unreadable index in {self.root}: {e}")
+            return
+        self.urns = index.get("urns", {})
+        self.blobs = index.get("blobs", {})
+        self.total_bytes = sum(blob["size"] for blob in self.blobs.values())
+
+    def save(self):
+        "Write the index if it changed; it is replaced atomically"
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.root, exist_ok=True)
+            tmp = self._index_path() + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"urns": self.urns, "blobs": self.blobs}, f)
+            os.replace(tmp, self._index_path())
+            self._dirty = False
+
+    def has(self, storage_urn: str) -> bool:
+        with self._lock:
+            return storage_urn in self.urns
+
+    def put(self, storage_urn: str, path: str) -> str:
+        """
+        Move a downloaded file into the store under its content hash and
+        return the hash. If identical content is already stored, the new copy
+        is discarded.
+        """
+        sha256 = file_sha256(path)
+        blob = self.blob_path(sha256)
+        with self._lock:
+            if sha256 in self.blobs and os.path.exists(blob):
+                os.remove(path)
+            else:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                os.replace(path, blob)
+                size = os.path.getsize(blob)
+                self.total_bytes += size - self.blobs.get(sha256, {}).get("size", 0)
+                self.blobs[sha256] = {"size": size, "last_used": time.time()}
+            self.urns[storage_urn] = sha256
+            self._dirty = True
+            self._evict(keep=sha256)
+        return sha256
+
+    def link(self, storage_urn: str, dest: str) -> bool:
+        "Materialize a stored URN at dest; returns False if the store does not have it"
+        with self._lock:
+            sha256 = self.urns.get(storage_urn)
+            if sha256 is None:
+                return False
+            blob = self.blob_path(sha256)
+            if sha256 not in self.blobs or not os.path.exists(blob):
+                self._forget(sha256)
+                return False
+            self.blobs[sha256]["last_used"] = time.time()
+            self._dirty = True
+
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        try:
+            os.link(blob, dest)
+        except FileExistsError:
+            pass
+        except OSError:
+            shutil.copyfile(blob, dest)
+        return True
+
+    def _forget(self, sha256: str):
+        blob = self.blobs.pop(sha256, None)
+        if blob:
+            self.total_bytes -= blob["size"]
+        for urn in [urn for urn, value in self.urns.items() if value == sha256]:
+            del self.urns[urn]
+        self._dirty = True
+
+    def _pinned(self, sha256: str) -> bool:
+        "True while an RFI folder holds a hardlink to the blob"
+        try:
+            return os.stat(self.blob_path(sha256)).st_nlink > 1
+        except FileNotFoundError:
+            return False
+
+    def _evict(self, keep: Optional[str] = None):
+        if self.total_bytes <= self.quota:
+            return
+        for sha256, _ in sorted(self.blobs.items(), key=lambda item: item[1]["last_used"]):
+            if self.total_bytes <= self.quota:
+                break
+            if sha256 == keep or self._pinned(sha256):
+                continue
+            try:
+                os.remove(self.blob_path(sha256))
+            except FileNotFoundError:
+                pass
+            self._forget(sha256)
+            logger.info(f"[BlobStore] Evicted {sha256[:12]} to stay under quota")
+        if self.total_bytes > self.quota:
+            logger.info(
+                f"[BlobStore] {self.total_bytes} bytes stored, over the {self.quota} byte quota; "
+                f"the rest is linked from RFI folders and is freed when they are deleted"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"urns": len(self.urns), "blobs": len(self.blobs), "bytes": self.total_bytes, "quota": self.quota}
+
+
+_stores: Dict[str, BlobStore] = {}
+_stores_lock = threading.Lock()
+
+
+def default_root(base_folder: str) -> str:
+    "DOWNLOAD_DIR/.blobs for folders inside DOWNLOAD_DIR, so every package shares one store"
+    download_dir = os.path.realpath(os.getenv("DOWNLOAD_DIR", "downloads"))
+    folder = os.path.realpath(base_folder)
+    if os.path.commonpath([download_dir, folder]) == download_dir:
+        return os.path.join(download_dir, ".blobs")
+    return os.path.join(folder, ".blobs")
+
+
+def get_blob_store(base_folder: str) -> Optional[BlobStore]:
+    "The shared store for downloads into base_folder, or None when disabled"
+    if not BLOB_STORE_ENABLED:
+        return None
+    root = os.path.abspath(BLOB_STORE_DIR or default_root(base_folder))
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = _stores[root] = BlobStore(root)
+        return store
@@ -1,32 +1,115 @@
 # Source: ca_document_manager\platforms\acc\client.py
 import json
 from dataclasses import dataclass
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import os
+import random
+import threading
+import time
 import requests
-from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlencode, quote
 from backend import token_store
-from pathlib import Path
+from backend.field_config import field_list
+from backend.metrics import acc_request_seconds, acc_responses, acc_retries
+from backend.platforms.acc.rate_limit import endpoint_family, rate_limiter
+from backend.rfi_cache import rfi_cache
+from backend.signed_url_cache import SIGNED_URL_MINUTES, signed_url_cache, url_expiry
 
 logger = logging.getLogger(__name__)
 
 from dotenv import load_dotenv
 load_dotenv()
 
+HTTP_POOL_SIZE = int(os.getenv("ACC_HTTP_POOL_SIZE", 32))
+HTTP_RETRIES = int(os.getenv("ACC_HTTP_RETRIES", 4))
+HTTP_BACKOFF = float(os.getenv("ACC_HTTP_BACKOFF", 0.5))
+HTTP_BACKOFF_JITTER = float(os.getenv("ACC_HTTP_BACKOFF_JITTER", 0.5))
+CONNECT_TIMEOUT = float(os.getenv("ACC_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.getenv("ACC_READ_TIMEOUT", 60))
+# Retried with backoff by the HTTP adapter; 429s go through rate_limiter instead
+RETRY_STATUSES = (500, 502, 503, 504)
+# Refresh access tokens this many seconds before they expire
+TOKEN_REFRESH_MARGIN = int(os.getenv("ACC_TOKEN_REFRESH_MARGIN", 300))
+# How long a worker holds, or waits for, the cross-worker refresh lock
+TOKEN_REFRESH_LOCK_TIMEOUT = float(os.getenv("ACC_TOKEN_REFRESH_LOCK_TIMEOUT", 30))
+
+
+STORAGE_URN_PREFIX = "urn:adsk.objects:os.object:"
+# OSS accepts at most 25 objects per batchsigneds3download request
+SIGNED_BATCH_SIZE = 25
+
+
+def parse_storage_urn(storage_urn: str) -> tuple:
+    "Split urn:adsk.objects:os.object:<bucket>/<object> into (bucket, object key)"
+    if not storage_urn or not storage_urn.startswith(STORAGE_URN_PREFIX):
+        raise ValueError(f"Invalid storage URN: {storage_urn}")
+    bucket, _, object_key = storage_urn[len(STORAGE_URN_PREFIX):].partition("/")
+    if not bucket or not object_key:
+        raise ValueError(f"Invalid storage URN: {storage_urn}")
+    return bucket, object_key
+
+
+def backoff_delay(attempt: int) -> float:
+    "Exponential backoff plus jitter before retry number `attempt` (from 0)"
+    return HTTP_BACKOFF * (2 ** attempt) + random.uniform(0, HTTP_BACKOFF_JITTER)
+
+
+class ServerErrorRetry(Retry):
+    "urllib3 Retry that leaves 429s alone even when they carry Retry-After"
+    RETRY_AFTER_STATUS_CODES = frozenset({503})
+
+
+def build_http_session(pool_size: int = HTTP_POOL_SIZE, retries: int = HTTP_RETRIES) -> requests.Session:
+    """
+    Create a keep-alive requests.Session with a pooled adapter. 5xx
+    responses are retried with exponential backoff plus jitter, honoring
+    Retry-After when the server sends it. 429s are left to the Client, which
+    retries them through the shared rate limiter.
+    """
+    retry = ServerErrorRetry(
+        total=retries,
+        backoff_factor=HTTP_BACKOFF,
+        backoff_jitter=HTTP_BACKOFF_JITTER,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+_refresh_locks: Dict[str, threading.Lock] = {}
+_refresh_locks_guard = threading.Lock()
+
+
+def _refresh_lock(session_id: Optional[str]) -> threading.Lock:
+    "In-process lock serializing token refreshes for one session"
+    with _refresh_locks_guard:
+        return _refresh_locks.setdefault(session_id or "", threading.Lock())
+
 @dataclass
 class Client:
     BASE_URL: str = "https://developer.api.autodesk.com"
 
-    def __init__(self):
-        "Initialize the ACC Client"
+    def __init__(self, session_id: Optional[str] = None, http: Optional[requests.Session] = None):
+        "Initialize the ACC Client, optionally bound to a session and sharing a pooled HTTP session"
         self.client_id = os.getenv("APS_CLIENT_ID")
         self.client_secret = os.getenv("APS_CLIENT_SECRET")
         self.redirect_uri = os.getenv("APS_REDIRECT_URI")
         self.project_id = os.getenv("ACC_PROJECT_ID")
         self.access_token = None
+        self.expires_at = 0
         self.user_id = None
-        self.session_id = None
+        self.session_id = session_id
+        self.http = http or build_http_session()
+        self.timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
         if not self.client_id or not self.client_secret:
             raise ValueError("APS_CLIENT_ID and APS_CLIENT_SECRET are required")
         if not self.project_id:
@@ -45,18 +128,24 @@ class Client:
         return f"{self.BASE_URL}{path}"
 
     def set_session(self, session_id: str):
+        if session_id != self.session_id:
+            # The held token belongs to the previous session
+            self.access_token = None
+            self.expires_at = 0
         self.session_id = session_id
 
-    def load_tokens(self):
-        return token_store.get_tokens(self.session_id)
+    def load_tokens(self, fresh: bool = False):
+        return token_store.get_tokens(self.session_id, fresh=fresh)
 
     def save_tokens(self, tokens):
         token_store.set_tokens(self.session_id, tokens)
         self.access_token = tokens["access_token"]
+        self.expires_at = int(time.time()) + tokens.get("expires_in", 3600)
 
     def clear_tokens(self):
         token_store.clear_tokens(self.session_id)
         self.access_token = None
+        self.expires_at = 0
         self.user_id = None
 
     #--------------------------------------------------
@@ -74,15 +163,39 @@ class Client:
         }
         return auth_url + "?" + urlencode(params)
 
-    def _request_with_auto_refresh(self, method: str, path: str, *, params=None, json_body=None):
+    def _send(self, method: str, path: str, *, params=None, json_body=None):
+        """
+        Send one ACC request within its endpoint family's rate budget. A 429
+        holds the family for Retry-After (for every worker) and is retried.
+        """
         url = self._url(path)
+        family = endpoint_family(path)
+        start = time.perf_counter()
+        for attempt in range(HTTP_RETRIES + 1):
+            rate_limiter.acquire(family)
+            r = self.http.request(method, url, headers=self.headers, params=params, json=json_body, timeout=self.timeout)
+            # 5xx retries happen inside the HTTP adapter; urllib3 records them on the raw response
+            server_retries = len(getattr(getattr(r.raw, "retries", None), "history", None) or ())
+            if server_retries:
+                acc_retries.inc(family, "5xx", amount=server_retries)
+            rate_limiter.observe(family, r, backoff=backoff_delay(attempt))
+            if r.status_code != 429 or attempt == HTTP_RETRIES:
+                break
+            acc_retries.inc(family, "429")
+        acc_request_seconds.observe(time.perf_counter() - start, family, method)
+        acc_responses.inc(family, str(r.status_code))
+        return r
 
-        r = requests.request(method, url, headers=self.headers, params=params, json=json_body)
+    def _request_with_auto_refresh(self, method: str, path: str, *, params=None, json_body=None):
+        self._ensure_fresh_token()
+
+        r = self._send(method, path, params=params, json_body=json_body)
 
-        # If access token expired, refresh once and retry once
+        # If access token was still rejected, refresh once and retry once
         if r.status_code == 401:
-            if self._refresh_tokens():
-                r = requests.request(method, url, headers=self.headers, params=params, json=json_body)
+            if self._refresh_tokens(stale_token=self.access_token):
+                acc_retries.inc(endpoint_family(path), "401")
+                r = self._send(method, path, params=params, json_body=json_body)
 
         return r
 
@@ -94,10 +207,68 @@ class Client:
             "auth_url": self.build_auth_url(state=session_id)
         }
 
-    def _refresh_tokens(self):
-        "Refresh tokens"
+    def _adopt(self, stored: Optional[Dict[str, Any]]) -> bool:
+        "Use the stored access token if it is good for at least TOKEN_REFRESH_MARGIN more seconds"
+        if stored and stored.get("access_token") and stored.get("expires_at", 0) - TOKEN_REFRESH_MARGIN > time.time():
+            self.access_token = stored["access_token"]
+            self.expires_at = stored["expires_at"]
+            return True
+        return False
+
+    def _ensure_fresh_token(self):
+        """
+        Refresh before sending when the token is missing or about to expire,
+        instead of paying for a 401 first. Another worker may already have
+        stored a fresh token for this session, in which case it is reused.
+        """
+        if self.access_token and self.expires_at - TOKEN_REFRESH_MARGIN > time.time():
+            return
+        if not self.session_id:
+            return
+        try:
+            stored = self.load_tokens()
+            # Nothing to refresh for a session that never logged in
+            if stored and not self._adopt(stored) and stored.get("refresh_token"):
+                self._refresh_tokens()
+        except Exception as e:
+            # Let the request go out; a 401 will take the reactive path
+            logger.warning(f"[Client] Proactive token refresh failed: {e}")
+
+    def _refresh_tokens(self, stale_token: Optional[str] = None):
+        """
+        Refresh tokens. Only one refresh per session runs at a time, across
+        threads (in-process lock) and workers (Redis lock). A caller that had
+        to wait uses the token the winner stored instead of spending the
+        refresh token again.
+        """
+        with _refresh_lock(self.session_id):
+            redis_lock = token_store.refresh_lock(self.session_id, timeout=TOKEN_REFRESH_LOCK_TIMEOUT)
+            try:
+                acquired = redis_lock.acquire(blocking_timeout=TOKEN_REFRESH_LOCK_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"[Client] Refresh lock unavailable, refreshing without it: {e}")
+                redis_lock, acquired = None, False
+            if redis_lock is not None and not acquired:
+                logger.warning(f"[Client] Timed out waiting for the refresh lock of session {self.session_id}")
+            try:
+                # Read past the local cache: the winner's write may not have been announced yet
+                stored = self.load_tokens(fresh=True)
+                if stale_token is not None:
+                    if stored and stored.get("access_token") != stale_token and self._adopt(stored):
+                        return True
+                elif self._adopt(stored):
+                    return True
+                return self._refresh_with(stored)
+            finally:
+                if acquired:
+                    try:
+                        redis_lock.release()
+                    except Exception as e:
+                        # Lock expired while refreshing; another worker may hold it now
+                        logger.warning(f"[Client] Could not release refresh lock: {e}")
+
+    def _refresh_with(self, stored: Optional[Dict[str, Any]]) -> bool:
         #print("Checking refresh tokens")
-        stored = self.load_tokens()
         if not stored or "refresh_token" not in stored:
             #print("No refresh token found")
             return False
@@ -109,7 +280,7 @@ class Client:
             "refresh_token": stored["refresh_token"],
             "scope": " ".join(["data:read", "account:read", "offline_access"])
         }
-        new_tokens = requests.post(url, data=body)
+        new_tokens = self.http.post(url, data=body, timeout=self.timeout)
         new_tokens.raise_for_status()
         if new_tokens.status_code != 200:
             #print("Refresh failed:", new_tokens.text)
@@ -133,11 +304,13 @@ class Client:
             "code": code,
             "redirect_uri": self.redirect_uri,
         }
-        r = requests.post(url, data=data)
+        r = self.http.post(url, data=data, timeout=self.timeout)
         r.raise_for_status()
         tokens = r.json()
         self.save_tokens(tokens)
         self.access_token = tokens["access_token"]
+        # A new login may be another user; ensure_user() checks them again
+        self.user_id = None
 
     def handle_callback(self, code: str):
         self._get_tokens(code)
@@ -177,6 +350,35 @@ class Client:
             raise
         return response
 
+    def iter_search_pages(self, body: Optional[Dict[str, Any]] = None, *, prefetch: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Yield search:rfis response pages lazily, advancing the offset until
+        pagination.totalResults is reached. With prefetch, the next page is
+        requested in the background while the caller works on the current one.
+        """
+        body = dict(body or {})
+        offset = body.get("offset") or 0
+
+        def fetch(page_offset: int) -> Dict[str, Any]:
+            return self.search_rfis(body={**body, "offset": page_offset})
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            page = fetch(offset)
+            while True:
+                results = page.get("results", [])
+                total = page.get("pagination", {}).get("totalResults", 0)
+                offset += len(results)
+                has_next = bool(results) and offset < total
+                pending = executor.submit(fetch, offset) if executor and has_next else None
+                yield page
+                if not has_next:
+                    return
+                page = pending.result() if pending else fetch(offset)
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
     def get_user_id(self) -> Optional[str]:
         path = f"construction/rfis/v3/projects/{self.project_id}/users/me"
         try:
@@ -186,9 +388,112 @@ class Client:
             raise
         return response["user"]["id"]
 
-    def get_rfi_by_id(self, rfi_id: str) -> dict:
+    def get_rfi_by_id(self, rfi_id: str, updated_at: Optional[str] = None) -> dict:
+        "Fetch one RFI, served from rfi_cache unless it changed since `updated_at`"
         path = f"construction/rfis/v3/projects/{self.project_id}/rfis/{rfi_id}"
-        return self.get(path=path)
+        return rfi_cache.get_or_fetch(
+            self.project_id,
+            rfi_id,
+            lambda: self.get(path=path),
+            updated_at=updated_at
+        )
+
+    def get_rfi_attachments(self, rfi_id: str) -> List[Dict[str, Any]]:
+        "List the attachments (files and document references) of an RFI"
+        path = f"construction/rfis/v3/projects/{self.project_id}/rfis/{rfi_id}/attachments"
+        try:
+            response = self.get(path=path)
+        except Exception as e:
+            logger.error(f"[Client] Get RFI attachments failed with error: {e}")
+            raise
+        return response.get("results", [])
+
+    def ensure_user(self):
+        """
+        Resolve the session's user through the project's users/me, once per
+        login. This fails for a session without access to the project, so it
+        also gates answers shared across sessions, like cached signed URLs.
+        """
+        if not self.user_id:
+            self.user_id = [self.get_user_id()]
+
+    def get_signed_download(self, storage_urn: str) -> str:
+        "Return a signed S3 download URL for an OSS storage URN, reusing a cached one while it is valid"
+        self.ensure_user()
+        url = signed_url_cache.get(self.project_id, storage_urn)
+        if url:
+            return url
+        bucket, object_key = parse_storage_urn(storage_urn)
+        path = f"oss/v2/buckets/{bucket}/objects/{quote(object_key, safe='')}/signeds3download"
+        requested_at = time.time()
+        try:
+            response = self.get(path=path, params={"minutesExpiration": SIGNED_URL_MINUTES})
+        except Exception as e:
+            logger.error(f"[Client] Get signed download failed with error: {e}")
+            raise
+        url = response.get("url")
+        if not url:
+            raise Exception(f"No signed URL returned for {storage_urn}")
+        signed_url_cache.set(self.project_id, storage_urn, url, url_expiry(url, requested_at))
+        return url
+
+    def _batch_signed_download(self, bucket: str, object_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        "One OSS batchsigneds3download call; returns the per-object results keyed by object key"
+        path = f"oss/v2/buckets/{bucket}/objects/batchsigneds3download?minutesExpiration={SIGNED_URL_MINUTES}"
+        body = {"requests": [{"objectKey": key} for key in object_keys]}
+        return self.post(path=path, body=body).get("results", {})
+
+    def get_signed_downloads(self, storage_urns: List[str], workers: int = 4) -> Dict[str, Any]:
+        """
+        Resolve signed S3 URLs for many storage URNs. Cached URLs are reused;
+        the rest are requested with OSS batchsigneds3download, grouped by
+        bucket in batches of SIGNED_BATCH_SIZE, and cached.
+        Returns {"urls": {urn: url}, "failures": {urn: error}}.
+        """
+        urns = list(dict.fromkeys(storage_urns))
+        self.ensure_user()
+        urls = signed_url_cache.get_many(self.project_id, urns)
+        failures = {}
+
+        batches: Dict[str, Dict[str, str]] = {}
+        for urn in urns:
+            if urn in urls:
+                continue
+            try:
+                bucket, object_key = parse_storage_urn(urn)
+            except ValueError as e:
+                failures[urn] = str(e)
+                continue
+            batches.setdefault(bucket, {})[object_key] = urn
+        chunks = []
+        for bucket, by_key in batches.items():
+            keys = list(by_key)
+            chunks.extend((bucket, keys[i:i + SIGNED_BATCH_SIZE]) for i in range(0, len(keys), SIGNED_BATCH_SIZE))
+
+        def resolve(chunk):
+            bucket, object_keys = chunk
+            requested_at = time.time()
+            try:
+                return chunk, requested_at, self._batch_signed_download(bucket, object_keys), None
+            except Exception as e:
+                logger.error(f"[Client] Batch signed download failed with error: {e}")
+                return chunk, requested_at, {}, str(e) or e.__class__.__name__
+
+        if chunks:
+            with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+                for (bucket, object_keys), requested_at, results, error in pool.map(resolve, chunks):
+                    resolved = {}
+                    for object_key in object_keys:
+                        urn = batches[bucket][object_key]
+                        result = results.get(object_key) or {}
+                        url = result.get("url")
+                        if url and result.get("status", "complete") == "complete":
+                            urls[urn] = url
+                            resolved[urn] = (url, url_expiry(url, requested_at))
+                        else:
+                            failures[urn] = error or result.get("reason") or f"No signed URL returned for {urn}"
+                    signed_url_cache.set_many(self.project_id, resolved)
+        return {"urls": urls, "failures": failures}
 
     def get_rfi_types(self) -> Optional[List[Dict[str, Any]]]:
         path = f"construction/rfis/v3/projects/{self.project_id}/rfi-types"
@@ -208,11 +513,6 @@ class Client:
     def get_rfi_attributes(self):
         """
         Displays all RFI attributes as provided by user in fieldList.json. File is in parent directory under userInput folder.
+        The parsed file is shared and only re-read when it changes.
         """
-        # Read the fieldList.json file
-        fieldListPath = Path(__file__).resolve().parents[2] /"userInput"/ "fieldList.json"
-        with open(fieldListPath, "r") as f:
-            fieldList = json.load(f)
-        return fieldList["groups"]
-        
-        
\ No newline at end of file
+        return field_list.groups
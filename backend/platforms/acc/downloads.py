@@ -0,0 +1,257 @@
+# Bulk attachment downloads: concurrent signed-URL resolution and resumable streaming.
+import logging
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.platforms.acc.blob_store import BlobStore, get_blob_store
+from backend.platforms.acc.client import Client
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_WORKERS = int(os.getenv("ACC_DOWNLOAD_WORKERS", 6))
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("ACC_DOWNLOAD_CHUNK_SIZE", 1024 * 1024))
+PART_SUFFIX = ".part"
+
+
+@dataclass
+class DownloadJob:
+    storage_urn: str
+    dest: str
+    display_name: Optional[str] = None
+
+
+@dataclass
+class DownloadReport:
+    completed: List[str] = field(default_factory=list)
+    failures: Dict[str, str] = field(default_factory=dict)
+    bytes_downloaded: int = 0
+    # Files served from the blob store or another job's download instead of the network
+    reused: int = 0
+
+    @property
+    def failed(self) -> int:
+        return len(self.failures)
+
+
+class DownloadProgress:
+    """
+    Thread-safe running totals for a batch of downloads. `callback`, if given,
+    is called with a snapshot dict after every chunk and every finished file.
+    """
+
+    def __init__(self, files_total: int = 0, callback: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.files_total = files_total
+        self.files_done = 0
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self.callback = callback
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "files_done": self.files_done,
+            "files_total": self.files_total,
+            "bytes_done": self.bytes_done,
+            "bytes_total": self.bytes_total,
+        }
+
+    def _update(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+            snapshot = self.snapshot()
+        if self.callback:
+            self.callback(snapshot)
+
+    def add_total(self, size: int):
+        self._update(bytes_total=size)
+
+    def add_bytes(self, size: int):
+        self._update(bytes_done=size)
+
+    def file_done(self):
+        self._update(files_done=1)
+
+
+def safe_filename(name: str) -> str:
+    "Strip path separators and characters Windows refuses in file names"
+    cleaned = re.sub(r'[<>:"/\\|?*\x00-\x1f]', "_", name or "").strip(" .")
+    return cleaned or "attachment"
+
+
+def resolve_signed_urls(client: Client, storage_urns: List[str], *, workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Resolve signed S3 URLs for many storage URNs: cached URLs first, the rest
+    through batched OSS requests. Returns {"urls": {urn: url}, "failures": {urn: error}}.
+    """
+    if not storage_urns:
+        return {"urls": {}, "failures": {}}
+    return client.get_signed_downloads(storage_urns, workers=workers or DOWNLOAD_WORKERS)
+
+
+def download_file(client: Client, url: str, dest: str, *, progress: Optional[DownloadProgress] = None, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> int:
+    """
+    Stream `url` to `dest` through a `.part` temp file that is renamed into
+    place once complete. A leftover `.part` from an interrupted run is resumed
+    with an HTTP Range request. Returns the number of bytes fetched.
+    """
+    part = dest + PART_SUFFIX
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    # Signed S3 URLs carry their own auth; no ACC bearer token is sent
+    with client.http.get(url, headers=headers, stream=True, timeout=client.timeout) as r:
+        if r.status_code == 416 and offset:
+            # Range starts at the end: the part file is already complete
+            os.replace(part, dest)
+            return 0
+        if r.status_code not in (200, 206):
+            raise Exception(f"Download failed with status code {r.status_code}")
+        if r.status_code == 200:
+            # Server ignored the Range header; start over
+            offset = 0
+        if progress:
+            length = int(r.headers.get("Content-Length") or 0)
+            progress.add_total(length)
+
+        fetched = 0
+        with open(part, "ab" if offset else "wb") as f:
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+                    fetched += len(chunk)
+                    if progress:
+                        progress.add_bytes(len(chunk))
+    os.replace(part, dest)
+    return fetched
+
+
+def download_attachments(
+    client: Client,
+    jobs: List[DownloadJob],
+    *,
+    workers: Optional[int] = None,
+    progress: Optional[DownloadProgress] = None,
+    store: Optional[BlobStore] = None
+) -> DownloadReport:
+    """
+    Resolve signed URLs for every job, then download them in parallel with a
+    bounded pool. Files already present at their destination are skipped, and
+    each storage URN is fetched at most once. With a blob store, URNs it
+    already holds are linked from it instead of downloaded.
+    """
+    report = DownloadReport()
+    progress = progress or DownloadProgress()
+    progress.files_total += len(jobs)
+    pending: Dict[str, List[DownloadJob]] = {}
+    for job in jobs:
+        if os.path.exists(job.dest):
+            report.completed.append(job.dest)
+            progress.file_done()
+        elif store is not None and store.link(job.storage_urn, job.dest):
+            report.completed.append(job.dest)
+            report.reused += 1
+            progress.file_done()
+        else:
+            pending.setdefault(job.storage_urn, []).append(job)
+
+    resolved = resolve_signed_urls(client, list(pending), workers=workers)
+    lock = threading.Lock()
+
+    def run(storage_urn: str):
+        group = pending[storage_urn]
+        url = resolved["urls"].get(storage_urn)
+        try:
+            if url is None:
+                raise Exception(resolved["failures"].get(storage_urn, "No signed URL"))
+            fetched, reused = 0, len(group) - 1
+            if store is not None:
+                # Another request may be fetching the same URN; wait for it, then reuse its blob
+                with store.staging(storage_urn) as target:
+                    if store.link(storage_urn, group[0].dest):
+                        reused += 1
+                    else:
+                        fetched = download_file(client, url, target, progress=progress)
+                        store.put(storage_urn, target)
+                for job in group:
+                    if not store.link(storage_urn, job.dest):
+                        raise Exception(f"{storage_urn} was evicted from the blob store before it was linked")
+            else:
+                target = group[0].dest
+                os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                fetched = download_file(client, url, target, progress=progress)
+                for job in group[1:]:
+                    os.makedirs(os.path.dirname(job.dest) or ".", exist_ok=True)
+                    shutil.copyfile(target, job.dest)
+            with lock:
+                report.completed.extend(job.dest for job in group)
+                report.bytes_downloaded += fetched
+                report.reused += reused
+        except Exception as e:
+            logger.error(f"[download_attachments] {group[0].display_name or storage_urn} failed: {e}")
+            with lock:
+                for job in group:
+                    report.failures[job.dest] = str(e) or e.__class__.__name__
+        finally:
+            for _ in group:
+                progress.file_done()
+
+    try:
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(workers or DOWNLOAD_WORKERS, len(pending))) as pool:
+                list(pool.map(run, pending))
+    finally:
+        if store is not None:
+            store.save()
+    return report
+
+
+def download_rfi_attachments(
+    client: Client,
+    rfis: List[Dict[str, Any]],
+    base_folder: str = "downloads",
+    *,
+    workers: Optional[int] = None,
+    progress: Optional[DownloadProgress] = None,
+    store: Optional[BlobStore] = None
+) -> DownloadReport:
+    """
+    Download every attachment of the given RFIs into
+    <base_folder>/<customIdentifier>/<displayName>. Attachment lists are
+    fetched concurrently too. Files are kept once in the blob store shared by
+    DOWNLOAD_DIR unless another store is passed or ACC_BLOB_STORE=0.
+    """
+    def list_attachments(rfi: Dict[str, Any]):
+        try:
+            return rfi, client.get_rfi_attachments(rfi["id"]), None
+        except Exception as e:
+            return rfi, [], str(e) or e.__class__.__name__
+
+    jobs, failures, seen = [], {}, set()
+    if rfis:
+        with ThreadPoolExecutor(max_workers=min(workers or DOWNLOAD_WORKERS, len(rfis))) as pool:
+            for rfi, attachments, error in pool.map(list_attachments, rfis):
+                folder = os.path.join(base_folder, safe_filename(rfi.get("customIdentifier") or rfi["id"]))
+                if error:
+                    failures[folder] = error
+                for att in attachments:
+                    storage_urn = att.get("storageUrn")
+                    if not storage_urn:
+                        continue
+                    name = safe_filename(att.get("displayName") or att.get("fileName") or att.get("name"))
+                    dest = os.path.join(folder, name)
+                    if dest in seen:
+                        continue
+                    seen.add(dest)
+                    jobs.append(DownloadJob(storage_urn, dest, name))
+
+    if store is None:
+        store = get_blob_store(base_folder)
+    report = download_attachments(client, jobs, workers=workers, progress=progress, store=store)
+    report.failures.update(failures)
+    return report
@@ -0,0 +1,262 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from backend.metrics import registry
+from backend.redis_client import LOCAL_STORE, redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def rate_limit_enabled() -> bool:
+    "ACC_RATE_LIMIT_ENABLED as it is now; read per request so it can be set after import (the stub benches do)"
+    return os.getenv("ACC_RATE_LIMIT_ENABLED", "1") != "0"
+
+
+# Share each family's budget across workers through Redis; falls back to a per-process bucket.
+# The embedded store serves one process, so it always uses per-process buckets.
+RATE_LIMIT_SHARED = os.getenv("ACC_RATE_LIMIT_SHARED", "1") != "0" and not LOCAL_STORE
+# Requests per minute per endpoint family; 0 leaves a family unlimited
+RATE_LIMITS = {
+    "search": float(os.getenv("ACC_RATE_LIMIT_SEARCH", 600)),
+    "rfi": float(os.getenv("ACC_RATE_LIMIT_RFI", 3000)),
+    "oss": float(os.getenv("ACC_RATE_LIMIT_OSS", 3000)),
+    "default": float(os.getenv("ACC_RATE_LIMIT_DEFAULT", 1200)),
+}
+# Seconds of budget that may be spent at once after an idle period
+RATE_LIMIT_BURST = float(os.getenv("ACC_RATE_LIMIT_BURST", 2))
+RATE_LIMIT_PREFIX = "ratelimit:"
+# How long to stay on the local bucket after Redis failed
+REDIS_RETRY_AFTER = 30
+
+# KEYS[1]: bucket hash. ARGV: rate (tokens/s), burst, cost, hold (s).
+# Tokens may go negative: the caller reserves its slot and sleeps the
+# returned delay, so waiters queue up instead of polling. `hold` puts the
+# bucket at least that many seconds in debt, which every worker then waits out.
+_TAKE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local cost, hold = tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+if hold > 0 then tokens = math.min(tokens, -hold * rate) end
+tokens = tokens - cost
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 60)
+if tokens >= 0 then return '0' end
+return tostring(-tokens / rate)
+"""
+
+
+def endpoint_family(path: str) -> str:
+    "Budget an ACC path is charged to"
+    path = path.lstrip("/")
+    if path.startswith("oss/"):
+        return "oss"
+    if path.startswith("construction/rfis/"):
+        return "search" if "/search:" in path else "rfi"
+    return "default"
+
+
+def retry_after(response) -> Optional[float]:
+    """
+    Seconds the server asked us to wait: Retry-After, or the reset of an
+    exhausted X-RateLimit window. Works for requests and httpx responses.
+    """
+    headers = response.headers
+    value = headers.get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+    if headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset"):
+        try:
+            reset = float(headers["X-RateLimit-Reset"])
+        except ValueError:
+            return None
+        # Either seconds until the reset or an epoch timestamp
+        return max(0.0, reset - time.time()) if reset > 1e9 else reset
+    return None
+
+
+class _LocalBucket:
+    "Same accounting as _TAKE_SCRIPT, for one process"
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, cost: float, hold: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.ts) * self.rate)
+            self.ts = now
+            if hold > 0:
+                self.tokens = min(self.tokens, -hold * self.rate)
+            self.tokens -= cost
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class RateLimiter:
+    """
+    Token bucket per endpoint family, refilled at the family's requests per
+    minute. Each request reserves a token before it is sent and sleeps until
+    its slot comes up, so concurrent callers are spread at the allowed rate
+    rather than bursting into 429s. A 429 or an exhausted rate-limit window
+    holds the family's bucket for the server's Retry-After; with Redis the
+    buckets, and those holds, are shared by every worker.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, float]] = None,
+        burst: float = RATE_LIMIT_BURST,
+        shared: bool = RATE_LIMIT_SHARED,
+        enabled: Optional[bool] = None
+    ):
+        self.limits = dict(RATE_LIMITS if limits is None else limits)
+        self.burst = burst
+        self.shared = shared
+        # None follows ACC_RATE_LIMIT_ENABLED
+        self._enabled = enabled
+        self._local: Dict[str, _LocalBucket] = {}
+        self._held_until: Dict[str, float] = {}
+        self._script = None
+        self._redis_down_until = 0.0
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "delayed": 0, "waited_s": 0.0, "throttled": 0, "local_fallbacks": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return rate_limit_enabled() if self._enabled is None else self._enabled
+
+    @enabled.setter
+    def enabled(self, value: Optional[bool]):
+        self._enabled = value
+
+    def _rate(self, family: str) -> Tuple[float, float]:
+        "(tokens per second, bucket size) for a family"
+        per_minute = self.limits.get(family, self.limits.get("default", 0))
+        rate = per_minute / 60
+        return rate, max(1.0, rate * self.burst)
+
+    def _count(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                self.counters[name] += amount
+
+    def _take(self, family: str, cost: float = 1, hold: float = 0) -> float:
+        "Reserve `cost` tokens (and apply `hold`); return seconds to wait first"
+        rate, burst = self._rate(family)
+        if not self.enabled or rate <= 0:
+            return self._held(family, hold)
+        if self.shared and time.monotonic() >= self._redis_down_until:
+            try:
+                if self._script is None:
+                    self._script = redis_client.register_script(_TAKE_SCRIPT)
+                return float(self._script(keys=[f"{RATE_LIMIT_PREFIX}{family}"], args=[rate, burst, cost, hold]))
+            except Exception as e:
+                logger.warning(f"[RateLimiter] Redis unavailable, using per-process buckets: {e}")
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+                self._count(local_fallbacks=1)
+        with self._lock:
+            bucket = self._local.get(family)
+            if bucket is None:
+                bucket = self._local[family] = _LocalBucket(rate, burst)
+        return bucket.take(cost, hold)
+
+    def _held(self, family: str, hold: float) -> float:
+        "Unpaced families still wait out a server's Retry-After, in this process"
+        now = time.monotonic()
+        with self._lock:
+            until = self._held_until.get(family, 0.0)
+            if hold > 0:
+                until = self._held_until[family] = max(until, now + hold)
+        return max(0.0, until - now)
+
+    def _reserve(self, family: str) -> float:
+        wait = self._take(family)
+        if wait > 0:
+            # A little jitter so a queue of waiters does not land in the same instant
+            wait += random.uniform(0, min(0.05, wait / 10))
+            self._count(requests=1, delayed=1, waited_s=wait)
+        else:
+            self._count(requests=1)
+        return wait
+
+    def acquire(self, family: str):
+        "Block until a request in `family` may be sent"
+        wait = self._reserve(family)
+        if wait > 0:
+            time.sleep(wait)
+
+    def _uses_redis(self, family: str) -> bool:
+        return self.enabled and self._rate(family)[0] > 0 and self.shared and time.monotonic() >= self._redis_down_until
+
+    async def acquire_async(self, family: str):
+        "acquire for coroutines; a Redis reservation runs in a thread so it does not block the event loop"
+        if self._uses_redis(family):
+            wait = await asyncio.to_thread(self._reserve, family)
+        else:
+            wait = self._reserve(family)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def hold(self, family: str, seconds: float):
+        "Pause `family` for every caller (and worker) for `seconds`"
+        if seconds > 0:
+            self._take(family, cost=0, hold=seconds)
+
+    def observe(self, family: str, response, backoff: float = 1.0) -> Optional[float]:
+        """
+        Apply what a response says about the budget. Returns the delay before
+        a 429 should be retried (Retry-After, else `backoff`), which has
+        already been applied as a hold.
+        """
+        delay = retry_after(response)
+        if response.status_code == 429:
+            if delay is None:
+                delay = backoff
+            self._count(throttled=1)
+            logger.warning(f"[RateLimiter] 429 on {family}, holding for {delay:.2f}s")
+            self.hold(family, delay)
+            return delay
+        if delay and response.headers.get("X-RateLimit-Remaining") == "0":
+            # Budget used up before a 429: wait for the window to reset
+            self.hold(family, delay)
+        return None
+
+    async def observe_async(self, family: str, response, backoff: float = 1.0) -> Optional[float]:
+        "observe for coroutines; only a response that holds the bucket touches Redis, in a thread"
+        if response.status_code == 429 or response.headers.get("X-RateLimit-Remaining") == "0":
+            return await asyncio.to_thread(self.observe, family, response, backoff)
+        return self.observe(family, response, backoff)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+        stats["waited_s"] = round(stats["waited_s"], 3)
+        stats["limits_per_minute"] = dict(self.limits)
+        return stats
+
+
+rate_limiter = RateLimiter()
+registry.collected(
+    "acc_rate_limit_events_total", "Rate limiter reservations, delayed reservations, 429s and Redis fallbacks",
+    lambda: {k: v for k, v in rate_limiter.counters.items() if k != "waited_s"}, ["event"], kind="counter"
+)
+registry.collected(
+    "acc_rate_limit_wait_seconds_total", "Time requests spent waiting for a rate-limit slot",
+    lambda: rate_limiter.counters["waited_s"], kind="counter"
+)
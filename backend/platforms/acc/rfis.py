@@ -1,8 +1,15 @@
 # Source: ca_document_manager\platforms\acc\rfis.py
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Set, Iterator
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from backend.metrics import rows, stage_seconds
 from backend.platforms.acc.client import Client
+import heapq
 import logging
+import os
+import queue
+import threading
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
@@ -21,6 +28,21 @@ def to_utc_iso(dt_str: str) -> str:
 
 logger = logging.getLogger(__name__)
 
+HYDRATE_WORKERS = int(os.getenv("ACC_HYDRATE_WORKERS", 8))
+SEARCH_PREFETCH = os.getenv("ACC_SEARCH_PREFETCH", "1") != "0"
+# How the updatedAfter filter is searched: "single" or "parallel"
+ACTIVITY_SEARCH = os.getenv("ACC_ACTIVITY_SEARCH", "single")
+
+OPEN_STATUSES = ["open", "openRev1", "openRev2"]
+
+# Fields search:rfis does not return; these still need a GET per RFI.
+# Taken from the ACC API reference (RFIs v3): the results of
+# POST .../search:rfis carry the RFI's own fields, while responses, draft
+# responses, comments and attachments are only on GET .../rfis/{id} and its
+# sub-resources. Re-check that list when the API version changes; the
+# projection bench fails when a projected field comes back empty.
+DETAIL_ONLY_FIELDS = frozenset({"responses", "draftResponses", "comments", "attachments"})
+
 def create_date_range(start: Optional[datetime]=None, end: Optional[datetime]=None)->Optional[str]:
     if not start and not end:
         return None
@@ -41,19 +63,24 @@ def create_date_range(start: Optional[datetime]=None, end: Optional[datetime]=No
     elif end:
         return f"..{end_date}"
 
-def search_rfis(
-    client: Client, 
+def iter_rfi_pages(
+    client: Client,
     *,
     search_text: Optional[str] = None,
     created_after: Optional[datetime]=None,
     updated_after: Optional[datetime]=None,
-    limit: int = 200
-) -> List[str]:
-    offset = 0
-
+    limit: int = 200,
+    fields: Optional[List[str]] = None,
+    prefetch: Optional[bool] = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Search open RFIs assigned to the current user and yield the result rows
+    one page at a time, projected to `fields` (defaults to just the id).
+    `limit` is the page size; every page up to totalResults is fetched.
+    """
     # Create filters
     filters = {
-        "status": ["open", "openRev1", "openRev2"],
+        "status": OPEN_STATUSES,
         "assignedTo": client.user_id
     }
 
@@ -63,28 +90,228 @@ def search_rfis(
     if updated_after:
         filters["updatedAt"] = create_date_range(start=updated_after)
 
+    body = search_body(search_text=search_text, filters=filters, limit=limit, fields=fields)
+    yield from iter_body_pages(client, body, prefetch=prefetch)
 
-    body = {
+def search_body(
+    *,
+    search_text: Optional[str] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    limit: int = 200,
+    fields: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    "Build a search:rfis request body sorted by createdAt ascending"
+    return {
         "limit": limit,
-        "offset": offset,
+        "offset": 0,
         "search": search_text,
         "sort":[{
             "field": "createdAt",
             "order": "ASC"
         }],
-        "filter": filters,
-        "fields": ["id"]
+        "filter": filters or {},
+        "fields": fields or ["id"]
     }
 
+def iter_body_pages(client: Client, body: Dict[str, Any], *, prefetch: Optional[bool] = None) -> Iterator[List[Dict[str, Any]]]:
+    "Yield the result rows of every page of a search:rfis body"
+    if prefetch is None:
+        prefetch = SEARCH_PREFETCH
+
     try:
-        response = client.search_rfis(body=body)
+        for page in client.iter_search_pages(body=body, prefetch=prefetch):
+            yield page.get("results", [])
     except Exception as e:
         logger.error(f"[search_rfis] Search RFIs failed with error: {e}")
         raise
 
-    ids = []
+def iter_in_background(iterator: Iterator[Any], maxsize: int = 2) -> Iterator[Any]:
+    """
+    Drive `iterator` on a daemon thread, buffering at most `maxsize` items,
+    so several paginated searches can run at once. Errors are re-raised in
+    the consumer.
+    """
+    items: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    done = object()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except Exception as e:
+            put((done, e))
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+def iter_activity_pages(
+    client: Client,
+    *,
+    search_text: Optional[str] = None,
+    activity_after: Optional[datetime] = None,
+    limit: int = 200,
+    fields: Optional[List[str]] = None,
+    strategy: Optional[str] = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield pages of RFIs created or updated at or after `activity_after`.
+
+    "single" (default) issues one updatedAt search: ACC stamps updatedAt on
+    creation and only moves it forward, so every RFI created after the cutoff
+    also has updatedAt after it. "parallel" runs the createdAt and updatedAt
+    searches concurrently and merges them by createdAt, dropping duplicates.
+    """
+    strategy = strategy or ACTIVITY_SEARCH
+    if strategy == "single":
+        yield from iter_rfi_pages(
+            client,
+            search_text=search_text,
+            updated_after=activity_after,
+            limit=limit,
+            fields=fields
+        )
+        return
+
+    fields = list(fields or ["id"])
+    if "createdAt" not in fields:
+        fields.append("createdAt")
+
+    def rows(**dates):
+        for page in iter_rfi_pages(client, search_text=search_text, limit=limit, fields=fields, **dates):
+            yield from page
+
+    # Both searches are sorted by createdAt ASC, so a streaming merge keeps that order
+    merged = heapq.merge(
+        iter_in_background(rows(created_after=activity_after)),
+        iter_in_background(rows(updated_after=activity_after)),
+        key=lambda row: row.get("createdAt") or ""
+    )
+    seen = set()
+    page = []
+    for row in merged:
+        if row.get("id") in seen:
+            continue
+        seen.add(row.get("id"))
+        page.append(row)
+        if len(page) >= limit:
+            yield page
+            page = []
+    if page:
+        yield page
+
+def search_rfi_rows(client: Client, **kwargs) -> List[Dict[str, Any]]:
+    "Collect every page of iter_rfi_pages into one list of rows"
+    rows = []
+    for page in iter_rfi_pages(client, **kwargs):
+        rows.extend(page)
+    return rows
+
+def search_rfis(
+    client: Client, 
+    *,
+    search_text: Optional[str] = None,
+    created_after: Optional[datetime]=None,
+    updated_after: Optional[datetime]=None,
+    limit: int = 200
+) -> List[str]:
+    rows = search_rfi_rows(
+        client,
+        search_text=search_text,
+        created_after=created_after,
+        updated_after=updated_after,
+        limit=limit
+    )
+    return [r.get("id") for r in rows]
+
+
+def search_projection(desired_fields: List[str], custom_fields: Set[str]) -> List[str]:
+    """
+    Build the search:rfis `fields` projection for the requested table columns.
+    Custom attribute columns are served from `customAttributes`; fields listed
+    in DETAIL_ONLY_FIELDS are left for the per-RFI GET. `updatedAt` is always
+    included so cached RFI details can be checked for changes.
+    """
+    projection = ["id", "updatedAt"]
+    needs_custom = False
+    for key in desired_fields:
+        if key in custom_fields:
+            needs_custom = True
+        elif key not in DETAIL_ONLY_FIELDS and key not in projection:
+            projection.append(key)
+    if needs_custom:
+        projection.append("customAttributes")
+    return projection
+
+
+@dataclass
+class HydrationResult:
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    failures: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def failed(self) -> int:
+        return len(self.failures)
+
+
+def hydrate_rfis(
+    client: Client,
+    rfi_ids: List[str],
+    *,
+    transform: Optional[Callable[[dict], dict]] = None,
+    workers: Optional[int] = None,
+    versions: Optional[Dict[str, str]] = None
+) -> HydrationResult:
+    """
+    Fetch full RFI payloads for the given IDs with a bounded thread pool.
+    Results keep the order of rfi_ids; IDs that fail (fetch or transform) are
+    left out of items and recorded in failures. `versions` maps IDs to the
+    updatedAt from a search so stale cache entries are refetched.
+    """
+    workers = max(1, workers or HYDRATE_WORKERS)
+    versions = versions or {}
+
+    def fetch(rfi_id: str):
+        try:
+            rfi = client.get_rfi_by_id(rfi_id, updated_at=versions.get(rfi_id))
+            if transform:
+                rfi = transform(rfi)
+            return rfi, None
+        except Exception as e:
+            return None, str(e) or e.__class__.__name__
+
+    result = HydrationResult()
+    if not rfi_ids:
+        return result
 
-    for r in response.get("results", []):
-        ids.append(r.get("id"))
+    with stage_seconds.time("hydrate"), ThreadPoolExecutor(max_workers=min(workers, len(rfi_ids))) as pool:
+        for rfi_id, (rfi, error) in zip(rfi_ids, pool.map(fetch, rfi_ids)):
+            if error is None:
+                result.items.append(rfi)
+            else:
+                result.failures[rfi_id] = error
+    rows.inc("hydrate", amount=len(result.items))
 
-    return ids
\ No newline at end of file
+    if result.failures:
+        logger.warning(f"[hydrate_rfis] {result.failed}/{len(rfi_ids)} RFIs failed to load")
+    return result
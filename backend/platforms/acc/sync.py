@@ -0,0 +1,259 @@
+# Incremental RFI sync: one full pull, then deltas since the last seen updatedAt.
+import contextlib
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from backend import token_store
+from backend.platforms.acc.client import Client
+from backend.platforms.acc.rfis import (
+    OPEN_STATUSES,
+    UTC,
+    iter_body_pages,
+    iter_rfi_pages,
+    search_body,
+    to_utc_iso,
+)
+
+logger = logging.getLogger(__name__)
+
+SYNC_PREFIX = "sync:rfis:"
+# Fields the engine needs on every row to decide membership and ordering
+SYNC_FIELDS = ["id", "customIdentifier", "status", "assignedTo", "createdAt", "updatedAt"]
+# Force a full pull after this long, to drop RFIs that became invisible to deltas
+SYNC_FULL_INTERVAL = int(os.getenv("RFI_SYNC_FULL_INTERVAL", 24 * 3600))
+# Scopes whose decoded state (and lock) a process keeps; the least recently used are dropped
+SYNC_LOCAL_SCOPES = int(os.getenv("RFI_SYNC_LOCAL_SCOPES", 32))
+# Rows are stored in this many chunks by RFI id, so a delta rewrites only the chunks it touched
+SYNC_CHUNKS = int(os.getenv("RFI_SYNC_CHUNKS", 64))
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _chunk(rfi_id: Optional[str], chunks: int = SYNC_CHUNKS) -> int:
+    return zlib.crc32(str(rfi_id).encode("utf-8")) % chunks
+
+
+def _active_since(row: Dict[str, Any], since: datetime) -> bool:
+    "Same rule as the createdAt/updatedAt search pair: created or updated at or after `since`"
+    stamps = (_parse_ts(row.get("createdAt")), _parse_ts(row.get("updatedAt")))
+    return any(ts is not None and ts >= since for ts in stamps)
+
+
+class RFISync:
+    """
+    Keeps a materialized set of open RFIs per (project, user, search text,
+    projection). The first load does a full search; later loads search only
+    for RFIs with updatedAt at or after the stored high-water mark and merge
+    them in, dropping rows that were closed, reassigned, or edited so they
+    no longer match the search text.
+
+    The high-water mark and the rows live in the token_store config space so
+    every worker shares them. Rows are split into SYNC_CHUNKS chunks by RFI
+    id, each its own key, so a delta rewrites only the chunks it changed
+    instead of the whole set. Each process also keeps a decoded copy of the
+    `max_scopes` most recently used scopes. Stored state expires when its
+    next full pull is due, so scopes nobody loads again (old search texts)
+    do not pile up.
+    """
+
+    def __init__(self, max_scopes: int = SYNC_LOCAL_SCOPES):
+        self.max_scopes = max_scopes
+        self._states: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # scope -> [lock, callers holding or waiting for it]
+        self._locks: "OrderedDict[str, list]" = OrderedDict()
+        self._guard = threading.Lock()
+
+    def _scope(self, client: Client, search_text: Optional[str], fields: List[str]) -> str:
+        raw = json.dumps([client.project_id, client.user_id, search_text, sorted(fields)])
+        return f"{SYNC_PREFIX}{client.project_id}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]}"
+
+    @contextlib.contextmanager
+    def _locked(self, scope: str) -> Iterator[None]:
+        "Hold the scope's lock; one process never runs two syncs of a scope at once"
+        with self._guard:
+            entry = self._locks.get(scope)
+            if entry is None:
+                entry = self._locks[scope] = [threading.Lock(), 0]
+            entry[1] += 1
+            self._locks.move_to_end(scope)
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                # Only locks nobody holds or waits for are dropped; a later caller gets a new one
+                excess = len(self._locks) - self.max_scopes
+                for old in list(self._locks):
+                    if excess <= 0:
+                        break
+                    if self._locks[old][1] == 0:
+                        del self._locks[old]
+                        excess -= 1
+
+    def _remember(self, scope: str, state: Dict[str, Any]):
+        with self._guard:
+            self._states[scope] = state
+            self._states.move_to_end(scope)
+            while len(self._states) > self.max_scopes:
+                self._states.popitem(last=False)
+
+    def _load(self, scope: str) -> Optional[Dict[str, Any]]:
+        "Return the freshest state for the scope, reloading rows if another worker advanced it"
+        with self._guard:
+            local = self._states.get(scope)
+        chunk_keys = [f"{scope}:rows:{n}" for n in range(SYNC_CHUNKS)]
+        try:
+            # The mark alone first: the rows are only transferred when another worker advanced it
+            stored_hwm = token_store.get_config(f"{scope}:hwm")
+            if local and local["hwm"] == stored_hwm:
+                return local
+            if stored_hwm is None:
+                return local
+            stored = token_store.get_configs([f"{scope}:meta"] + chunk_keys)
+        except Exception as e:
+            logger.warning(f"[RFISync] Could not read sync state, using local copy: {e}")
+            return local
+        try:
+            meta = json.loads(stored[f"{scope}:meta"] or "null")
+            if not meta or meta.get("chunks") != SYNC_CHUNKS or any(stored[key] is None for key in chunk_keys):
+                return local
+            state = {
+                "hwm": meta["hwm"],
+                "full_at": meta["full_at"],
+                "chunks": [json.loads(stored[key]) for key in chunk_keys],
+            }
+        except (json.JSONDecodeError, KeyError):
+            return local
+        self._remember(scope, state)
+        return state
+
+    def _save(self, scope: str, state: Dict[str, Any], chunks: Optional[Set[int]] = None):
+        "Store the mark and the given chunks (all of them when None)"
+        self._remember(scope, state)
+        chunks = range(SYNC_CHUNKS) if chunks is None else sorted(chunks)
+        values = {f"{scope}:rows:{n}": json.dumps(state["chunks"][n]) for n in chunks}
+        values[f"{scope}:meta"] = json.dumps({"hwm": state["hwm"], "full_at": state["full_at"], "chunks": SYNC_CHUNKS})
+        # Last in the pipeline, so a reader that sees the new mark finds its rows
+        values[f"{scope}:hwm"] = state["hwm"]
+        # Kept until the next full pull is due; after that the state would be replaced anyway
+        ttl = max(1, int(state.get("full_at", 0) + SYNC_FULL_INTERVAL - time.time()))
+        try:
+            token_store.set_configs(values, ttl)
+        except Exception as e:
+            logger.warning(f"[RFISync] Could not store sync state: {e}")
+
+    def _is_member(self, client: Client, row: Dict[str, Any]) -> bool:
+        if row.get("status") not in OPEN_STATUSES:
+            return False
+        assignees = {a.get("id") if isinstance(a, dict) else a for a in row.get("assignedTo") or []}
+        return bool(assignees & set(client.user_id or []))
+
+    def _full_pull(self, client: Client, search_text: Optional[str], fields: List[str], limit: int) -> Dict[str, Any]:
+        chunks: List[Dict[str, Any]] = [{} for _ in range(SYNC_CHUNKS)]
+        hwm = ""
+        for page in iter_rfi_pages(client, search_text=search_text, limit=limit, fields=fields):
+            for row in page:
+                chunks[_chunk(row.get("id"))][row.get("id")] = row
+                hwm = max(hwm, row.get("updatedAt") or "")
+        return {"hwm": hwm, "full_at": time.time(), "chunks": chunks}
+
+    def _delta(self, client: Client, state: Dict[str, Any], search_text: Optional[str], fields: List[str], limit: int) -> Optional[Set[int]]:
+        """
+        Merge RFIs updated since the high-water mark into state. Returns the
+        chunks that changed, or None when nothing did (not even the mark).
+        """
+        # No status/assignee filter: RFIs that were closed or reassigned must be seen to be dropped
+        filters = {"updatedAt": f"{state['hwm']}..9999-12-31T23:59:59Z"}
+        body = search_body(search_text=search_text, filters=filters, limit=limit, fields=fields)
+        chunks = state["chunks"]
+        hwm = state["hwm"]
+        changed: Set[int] = set()
+        matched: Set[str] = set()
+        for page in iter_body_pages(client, body):
+            for row in page:
+                rfi_id = row.get("id")
+                matched.add(rfi_id)
+                n = _chunk(rfi_id)
+                if self._is_member(client, row):
+                    if chunks[n].get(rfi_id) != row:
+                        chunks[n][rfi_id] = row
+                        changed.add(n)
+                elif chunks[n].pop(rfi_id, None) is not None:
+                    changed.add(n)
+                if (row.get("updatedAt") or "") > hwm:
+                    hwm = row.get("updatedAt")
+        if search_text and search_text.strip():
+            # RFIs edited so they no longer match the search text are absent above; find and drop them
+            body = search_body(filters=filters, limit=limit, fields=["id", "updatedAt"])
+            for page in iter_body_pages(client, body):
+                for row in page:
+                    rfi_id = row.get("id")
+                    if rfi_id not in matched and chunks[_chunk(rfi_id)].pop(rfi_id, None) is not None:
+                        changed.add(_chunk(rfi_id))
+                    if (row.get("updatedAt") or "") > hwm:
+                        hwm = row.get("updatedAt")
+        if not changed and hwm == state["hwm"]:
+            return None
+        state["hwm"] = hwm
+        return changed
+
+    def sync(self, client: Client, *, search_text: Optional[str], fields: List[str], limit: int = 200) -> List[Dict[str, Any]]:
+        "Bring the scope's materialized set up to date and return a snapshot of its rows"
+        fields = sorted(set(fields) | set(SYNC_FIELDS))
+        scope = self._scope(client, search_text, fields)
+        with self._locked(scope):
+            state = self._load(scope)
+            if state is None or time.time() - state.get("full_at", 0) > SYNC_FULL_INTERVAL or not state["hwm"]:
+                state = self._full_pull(client, search_text, fields, limit)
+                logger.info(f"[RFISync] Full pull of {sum(map(len, state['chunks']))} RFIs for {scope}")
+                self._save(scope, state)
+            else:
+                changed = self._delta(client, state, search_text, fields, limit)
+                if changed is not None:
+                    self._save(scope, state, changed)
+            # Rows are replaced, never mutated, so a list of references is a safe snapshot
+            return [row for chunk in state["chunks"] for row in chunk.values()]
+
+    def pages(self, client: Client, filters: Dict[str, Any], fields: List[str]) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield the synced rows matching the table filters in pages of `limit`,
+        sorted by createdAt like the search endpoint. Each page is copied as
+        it is handed out, so callers may change its rows.
+        """
+        limit = filters.get("limit", 200)
+        rows = self.sync(
+            client,
+            search_text=filters.get("searchText", " "),
+            fields=fields,
+            limit=limit,
+        )
+
+        activity_after = filters.get("updatedAfter")
+        if activity_after:
+            since = datetime.strptime(to_utc_iso(activity_after), "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=UTC)
+            rows = [row for row in rows if _active_since(row, since)]
+
+        # Chunks hold rows in hash order; the RFI number breaks createdAt ties the same way every load
+        rows.sort(key=lambda row: (row.get("createdAt") or "", row.get("customIdentifier") or ""))
+        for start in range(0, len(rows), limit):
+            yield copy.deepcopy(rows[start:start + limit])
+
+
+rfi_sync = RFISync()
@@ -0,0 +1,186 @@
+"""
+Per-request phase timings (sent as a Server-Timing header) and an opt-in
+sampling profiler for slow requests. A profiled request is sampled every
+PROFILE_INTERVAL_MS from a background thread; if it takes longer than
+PROFILE_THRESHOLD_MS the samples are written to PROFILE_DIR as collapsed
+stacks ("frame;frame;frame count" lines), the input format of flamegraph.pl
+and speedscope. Only the newest PROFILE_KEEP files are kept.
+"""
+import contextlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Profile every request, or only those sent with PROFILE_HEADER: 1
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0") != "0"
+PROFILE_HEADER = "X-Profile"
+# Off by default: any client could otherwise make the server sample and write profiles
+PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "0") != "0"
+PROFILE_THRESHOLD_MS = float(os.getenv("PROFILE_THRESHOLD_MS", 1000))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 50))
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") != "0"
+
+_local = threading.local()
+_NULL = contextlib.nullcontext()
+
+
+class Timings:
+    "Wall time per phase for one request, accumulated in the thread handling it"
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def header(self) -> str:
+        "Server-Timing value: each phase plus the total, in milliseconds"
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+@contextlib.contextmanager
+def request_timings() -> Iterator[Timings]:
+    "Collect phase() calls made by this thread into a new Timings"
+    timings = _local.timings = Timings()
+    try:
+        yield timings
+    finally:
+        _local.timings = None
+
+
+def phase(name: str):
+    "Time a block into the current request's phase `name`; a no-op outside a request"
+    timings = getattr(_local, "timings", None)
+    if timings is None:
+        return _NULL
+    return timings.phase(name)
+
+
+def timed_iter(items: Iterable, name: str) -> Iterator:
+    "Yield from `items`, counting the time spent producing each item as phase `name`"
+    timings = getattr(_local, "timings", None)
+    if timings is None:
+        yield from items
+        return
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            timings.add(name, time.perf_counter() - start)
+            return
+        timings.add(name, time.perf_counter() - start)
+        yield item
+
+
+def profile_requested(header_value: Optional[str]) -> bool:
+    if PROFILE_REQUESTS:
+        return True
+    return PROFILE_HEADER_ENABLED and (header_value or "").strip() not in ("", "0")
+
+
+def _label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Sampler:
+    """
+    Samples the stack of the thread that started it, and of ThreadPoolExecutor
+    workers busy in backend code (hydration and search prefetch run there),
+    every `interval` seconds. Pool threads are not tied to a request, so under
+    concurrent load their samples can include other requests' work.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.target = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> "Sampler":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        backend_dir = os.path.dirname(os.path.abspath(__file__))
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == self.target:
+                    root = "request"
+                elif names.get(ident, "").startswith("ThreadPoolExecutor"):
+                    root = "pool"
+                else:
+                    continue
+                stack = []
+                in_backend = root == "request"
+                while frame is not None:
+                    code = frame.f_code
+                    in_backend = in_backend or code.co_filename.startswith(backend_dir)
+                    stack.append(_label(code))
+                    frame = frame.f_back
+                if not in_backend:
+                    continue  # an idle pool worker waiting for work
+                stack.append(root)
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _rotate(folder: str, keep: int):
+    files = sorted(
+        (os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(".folded")),
+        key=os.path.getmtime,
+    )
+    for path in files[:max(0, len(files) - keep)]:
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.debug(f"[profiling] Could not remove {path}: {e}")
+
+
+def save(sampler: Sampler, route: str, seconds: float, folder: str = PROFILE_DIR, keep: int = PROFILE_KEEP) -> Optional[str]:
+    "Write the samples as a .folded file named after the time, route and duration; return its path"
+    if not sampler.stacks:
+        return None
+    os.makedirs(folder, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", route).strip("-") or "root"
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(folder, f"{stamp}-{slug}-{int(seconds * 1000)}ms-{threading.get_ident() % 10000}.folded")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(sampler.collapsed())
+    _rotate(folder, keep)
+    logger.info(f"[profiling] {route} took {seconds:.2f}s, {sampler.samples} samples written to {path}")
+    return path
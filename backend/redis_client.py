@@ -1,15 +1,51 @@
+import logging
 import os
 import redis
+from redis.backoff import ExponentialWithJitterBackoff
+from redis.retry import Retry
+
+from backend.local_store import LocalStore
 
 from dotenv import load_dotenv
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 REDIS_URL = os.getenv("REDIS_URL")
+# Connections shared by every thread of a worker; callers wait up to REDIS_POOL_TIMEOUT for a free one
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 64))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 5))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 5))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", 2))
+# Idle connections are pinged before reuse after this many seconds
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
+# Retries after a connection error or timeout, with jittered exponential backoff
+REDIS_RETRIES = int(os.getenv("REDIS_RETRIES", 2))
+# Without REDIS_URL, the embedded store keeps its data here (":memory:" to keep nothing)
+LOCAL_STORE_PATH = os.getenv("LOCAL_STORE_PATH", os.path.join(os.path.expanduser("~"), ".ca_manager", "store.sqlite3"))
+LOCAL_STORE = not REDIS_URL
+
+
+def build_redis(url: str) -> redis.Redis:
+    "Client on a bounded, health-checked pool that retries connection errors and timeouts"
+    pool = redis.BlockingConnectionPool.from_url(
+        url,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        socket_keepalive=True,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        retry=Retry(
+            ExponentialWithJitterBackoff(base=0.05, cap=1), REDIS_RETRIES,
+            supported_errors=(redis.ConnectionError, redis.TimeoutError),
+        ),
+        decode_responses=True,
+    )
+    return redis.Redis(connection_pool=pool)
 
-if not REDIS_URL:
-    raise RuntimeError("REDIS_URL is not set")
 
-redis_client = redis.Redis.from_url(
-    REDIS_URL,
-    decode_responses=True
-)
+if LOCAL_STORE:
+    redis_client = LocalStore(LOCAL_STORE_PATH)
+else:
+    redis_client = build_redis(REDIS_URL)
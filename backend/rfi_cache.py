@@ -0,0 +1,186 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+from backend.metrics import registry
+from backend.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+RFI_PREFIX = "rfi:"
+RFI_CACHE_TTL = int(os.getenv("RFI_CACHE_TTL", 24 * 3600))
+RFI_CACHE_LOCAL_SIZE = int(os.getenv("RFI_CACHE_LOCAL_SIZE", 2048))
+RFI_CACHE_ENABLED = os.getenv("RFI_CACHE_ENABLED", "1") != "0"
+
+
+def _key(project_id: str, rfi_id: str) -> str:
+    return f"{RFI_PREFIX}{project_id}:{rfi_id}"
+
+
+class RFICache:
+    """
+    Read-through cache of RFI detail payloads keyed by project and RFI id.
+    An in-process LRU sits in front of Redis; both tiers expire after `ttl`
+    seconds. Passing the `updatedAt` seen in a search result drops entries
+    for RFIs that changed since they were cached.
+    Payloads are kept as JSON text so callers always get a fresh dict.
+    """
+
+    def __init__(self, ttl: int = RFI_CACHE_TTL, local_size: int = RFI_CACHE_LOCAL_SIZE, enabled: bool = RFI_CACHE_ENABLED):
+        self.ttl = ttl
+        self.local_size = local_size
+        self.enabled = enabled
+        self._local: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"local_hits": 0, "redis_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _local_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at < time.time():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return data
+
+    def _local_set(self, key: str, data: str, expires_at: float):
+        with self._lock:
+            self._local[key] = (expires_at, data)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def _redis_get(self, key: str) -> Optional[str]:
+        "Read from Redis; the local copy expires when the Redis entry does, not a full ttl later"
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.pttl(key)
+            data, remaining_ms = pipe.execute()
+        except Exception as e:
+            logger.debug(f"[RFICache] Redis get failed: {e}")
+            data, remaining_ms = None, -2
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        if data is not None:
+            # -1: no expiry set in Redis, keep the local copy for the full ttl
+            remaining = self.ttl if remaining_ms is None or remaining_ms < 0 else remaining_ms / 1000
+            self._local_set(key, data, time.time() + remaining)
+        return data
+
+    def _decode(self, data: Optional[str], tier: str, updated_at: Optional[str]) -> tuple[Optional[dict], bool]:
+        "(payload, stale); a stale entry must be invalidated by the caller"
+        if data is None:
+            self._count("misses")
+            return None, False
+        rfi = json.loads(data)
+        if updated_at and rfi.get("updatedAt") != updated_at:
+            self._count("misses")
+            return None, True
+        self._count(tier)
+        return rfi, False
+
+    def get(self, project_id: str, rfi_id: str, updated_at: Optional[str] = None) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        key = _key(project_id, rfi_id)
+
+        data = self._local_get(key)
+        tier = "local_hits"
+        if data is None:
+            tier = "redis_hits"
+            data = self._redis_get(key)
+        rfi, stale = self._decode(data, tier, updated_at)
+        if stale:
+            self.invalidate(project_id, rfi_id)
+        return rfi
+
+    async def get_async(self, project_id: str, rfi_id: str, updated_at: Optional[str] = None) -> Optional[dict]:
+        "get for coroutines: local hits are answered inline, Redis is read in a thread"
+        if not self.enabled:
+            return None
+        key = _key(project_id, rfi_id)
+
+        data = self._local_get(key)
+        tier = "local_hits"
+        if data is None:
+            tier = "redis_hits"
+            data = await asyncio.to_thread(self._redis_get, key)
+        rfi, stale = self._decode(data, tier, updated_at)
+        if stale:
+            await asyncio.to_thread(self.invalidate, project_id, rfi_id)
+        return rfi
+
+    def _store(self, project_id: str, rfi_id: str, rfi: dict) -> Optional[tuple[str, str]]:
+        "Put the payload in the local tier; return the (key, data) still to be written to Redis"
+        if not self.enabled:
+            return None
+        key = _key(project_id, rfi_id)
+        data = json.dumps(rfi)
+        self._local_set(key, data, time.time() + self.ttl)
+        return key, data
+
+    def _redis_set(self, key: str, data: str):
+        try:
+            redis_client.setex(key, self.ttl, data)
+        except Exception as e:
+            logger.debug(f"[RFICache] Redis set failed: {e}")
+
+    def set(self, project_id: str, rfi_id: str, rfi: dict):
+        pending = self._store(project_id, rfi_id, rfi)
+        if pending:
+            self._redis_set(*pending)
+
+    async def set_async(self, project_id: str, rfi_id: str, rfi: dict):
+        pending = self._store(project_id, rfi_id, rfi)
+        if pending:
+            await asyncio.to_thread(self._redis_set, *pending)
+
+    def invalidate(self, project_id: str, rfi_id: str):
+        key = _key(project_id, rfi_id)
+        with self._lock:
+            self._local.pop(key, None)
+            self.counters["invalidations"] += 1
+        try:
+            redis_client.delete(key)
+        except Exception as e:
+            logger.debug(f"[RFICache] Redis delete failed: {e}")
+
+    def get_or_fetch(self, project_id: str, rfi_id: str, fetch: Callable[[], dict], updated_at: Optional[str] = None) -> dict:
+        "Return the cached payload, or call fetch() and cache its result"
+        rfi = self.get(project_id, rfi_id, updated_at=updated_at)
+        if rfi is None:
+            rfi = fetch()
+            self.set(project_id, rfi_id, rfi)
+        return rfi
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["local_size"] = len(self._local)
+        lookups = stats["local_hits"] + stats["redis_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+rfi_cache = RFICache()
+registry.collected(
+    "rfi_cache_events_total", "RFI detail cache hits by tier, misses, evictions and invalidations",
+    lambda: dict(rfi_cache.counters), ["event"], kind="counter"
+)
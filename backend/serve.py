@@ -0,0 +1,189 @@
+"""
+Production server: backend.wsgi:app under waitress, optionally in several
+worker processes sharing one listening socket.
+
+    python -m backend.serve
+"""
+import _thread
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("PORT", 8000))
+# Requests handled concurrently per process; a slow ACC call only holds one thread
+SERVE_THREADS = int(os.getenv("WAITRESS_THREADS", 16))
+SERVE_CONNECTION_LIMIT = int(os.getenv("WAITRESS_CONNECTION_LIMIT", 200))
+SERVE_CHANNEL_TIMEOUT = int(os.getenv("WAITRESS_CHANNEL_TIMEOUT", 120))
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", 1))
+# How long in-flight requests get to finish after SIGTERM/SIGINT
+SHUTDOWN_TIMEOUT = float(os.getenv("SERVE_SHUTDOWN_TIMEOUT", 30))
+
+# Set while this process is accepting requests; /api/ready reports it
+ready = threading.Event()
+
+
+def _busy(server) -> int:
+    "Requests being handled or queued by the server's task threads"
+    dispatcher = server.task_dispatcher
+    with dispatcher.lock:
+        return dispatcher.active_count + len(dispatcher.queue)
+
+
+def drain(server, loop_thread: threading.Thread, timeout: float = SHUTDOWN_TIMEOUT):
+    """
+    Stop accepting connections, wait up to `timeout` for in-flight requests,
+    then stop the server loop.
+    """
+    ready.clear()
+    server.accepting = False
+    deadline = time.monotonic() + timeout
+    while _busy(server) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    if _busy(server):
+        logger.warning(f"[serve] {_busy(server)} request(s) still running after {timeout}s, stopping anyway")
+    if loop_thread is threading.main_thread():
+        # Delivered as SIGINT to the handler below, which raises
+        # KeyboardInterrupt; waitress closes the server when its loop sees it
+        server.drained = True
+        _thread.interrupt_main()
+    else:
+        server.close()
+
+
+def _serve_one(app, *, host: str, port: int, threads: int, connection_limit: int, sockets: Optional[List[socket.socket]] = None):
+    from waitress.server import create_server
+
+    options = {"threads": threads, "connection_limit": connection_limit, "channel_timeout": SERVE_CHANNEL_TIMEOUT}
+    if sockets:
+        server = create_server(app, sockets=sockets, **options)
+    else:
+        server = create_server(app, host=host, port=port, **options)
+
+    loop_thread = threading.current_thread()
+    if loop_thread is threading.main_thread():
+        def on_signal(signum, frame):
+            if getattr(server, "drained", False):
+                # Raise once; later signals must not interrupt waitress's own shutdown
+                server.drained = False
+                raise KeyboardInterrupt
+            if not ready.is_set():
+                return  # already draining or stopping
+            logger.info(f"[serve] Received signal {signum}, draining")
+            ready.clear()
+            threading.Thread(target=drain, args=(server, loop_thread), daemon=True).start()
+
+        signal.signal(signal.SIGTERM, on_signal)
+        signal.signal(signal.SIGINT, on_signal)
+
+    logger.info(f"[serve] Worker {os.getpid()} serving on {host}:{port} with {threads} threads")
+    ready.set()
+    try:
+        server.run()
+    finally:
+        ready.clear()
+    return server
+
+
+def _serve_workers(app, *, host: str, port: int, threads: int, connection_limit: int, workers: int):
+    "Fork `workers` processes that accept on one shared socket; restart any that die"
+    sock = socket.create_server((host, port), backlog=1024)
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                _serve_one(app, host=host, port=port, threads=threads, connection_limit=connection_limit, sockets=[sock])
+            except BaseException:
+                logger.exception("[serve] Worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = pid
+
+    def forward(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for _ in range(workers):
+        spawn()
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    logger.info(f"[serve] Started {workers} workers on {host}:{port}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.pop(pid, None)
+        if not stopping:
+            logger.warning(f"[serve] Worker {pid} exited with status {status}, restarting")
+            spawn()
+    sock.close()
+
+
+def worker_count(workers: int) -> int:
+    """
+    `workers`, or 1 when the embedded store stands in for Redis: its SQLite
+    connection must not be shared across fork, and its pub/sub and locks
+    only reach threads of one process.
+    """
+    from backend.redis_client import LOCAL_STORE
+
+    if workers > 1 and LOCAL_STORE:
+        logger.warning(f"[serve] SERVE_WORKERS={workers} needs REDIS_URL; the embedded store serves one process")
+        return 1
+    return workers
+
+
+def serve(
+    app,
+    *,
+    host: str = SERVE_HOST,
+    port: int = SERVE_PORT,
+    threads: int = SERVE_THREADS,
+    connection_limit: int = SERVE_CONNECTION_LIMIT,
+    workers: int = SERVE_WORKERS
+):
+    "Serve `app` with waitress; more than one worker needs os.fork (not available on Windows)"
+    if workers > 1 and not hasattr(os, "fork"):
+        logger.warning("[serve] Multiple workers need os.fork; running a single process")
+        workers = 1
+    workers = worker_count(workers)
+    if workers > 1:
+        _serve_workers(app, host=host, port=port, threads=threads, connection_limit=connection_limit, workers=workers)
+    else:
+        _serve_one(app, host=host, port=port, threads=threads, connection_limit=connection_limit)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    from backend.wsgi import app
+    # Under `python -m` this file runs as __main__; go through the imported
+    # module so /api/ready sees the same `ready` event
+    from backend import serve as module
+    module.serve(app)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import requests
+
+from backend.api import API
+from backend.metrics import registry
+from backend.platforms.acc.client import build_http_session
+
+logger = logging.getLogger(__name__)
+
+# Most recently used sessions kept in memory; evicted ones are rebuilt from Redis on demand
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", 256))
+
+
+class SessionRegistry:
+    """
+    One API (and Client) per session id, so concurrent requests never share
+    the mutable session, token and user state of a Client. Entries are kept
+    in an LRU bounded by `max_sessions`. Tokens live in token_store, so an
+    evicted session only loses its in-memory state. All clients share one
+    pooled HTTP session.
+    """
+
+    def __init__(self, max_sessions: int = SESSION_CACHE_SIZE, factory: Optional[Callable[[str], API]] = None):
+        self.max_sessions = max_sessions
+        self.http: Optional[requests.Session] = None
+        self.factory = factory or self._create
+        self._apis: "OrderedDict[str, API]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _create(self, session_id: str) -> API:
+        if self.http is None:
+            self.http = build_http_session()
+        return API(session_id=session_id, http=self.http)
+
+    def get(self, session_id: str) -> API:
+        with self._lock:
+            api = self._apis.get(session_id)
+            if api is not None:
+                self._apis.move_to_end(session_id)
+                return api
+        # Build outside the lock; if two threads race, the first one stored wins
+        created = self.factory(session_id)
+        with self._lock:
+            api = self._apis.setdefault(session_id, created)
+            self._apis.move_to_end(session_id)
+            while len(self._apis) > self.max_sessions:
+                evicted, _ = self._apis.popitem(last=False)
+                self.evictions += 1
+                logger.debug(f"[SessionRegistry] Evicted session {evicted}")
+            return api
+
+    def discard(self, session_id: str):
+        with self._lock:
+            self._apis.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._apis)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"sessions": len(self._apis), "max_sessions": self.max_sessions, "evictions": self.evictions}
+
+
+sessions = SessionRegistry()
+registry.collected("sessions_active", "Sessions with an API client in memory", lambda: len(sessions))
+registry.collected("sessions_evicted_total", "Sessions dropped from the in-memory LRU", lambda: sessions.evictions, kind="counter")
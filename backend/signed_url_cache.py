@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from backend import token_store
+from backend.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+SIGNED_PREFIX = "signed:"
+# Lifetime requested from OSS (minutesExpiration, 1-60)
+SIGNED_URL_MINUTES = min(60, max(1, int(os.getenv("ACC_SIGNED_URL_MINUTES", 60))))
+# Entries are dropped this many seconds before the URL itself expires
+SIGNED_URL_MARGIN = int(os.getenv("ACC_SIGNED_URL_MARGIN", 120))
+SIGNED_URL_CACHE_ENABLED = os.getenv("ACC_SIGNED_URL_CACHE", "1") != "0"
+
+
+def _key(project_id: str, storage_urn: str) -> str:
+    return f"{SIGNED_PREFIX}{project_id}:{storage_urn}"
+
+
+def url_expiry(url: str, requested_at: float, minutes: int = SIGNED_URL_MINUTES) -> float:
+    """
+    Epoch seconds at which a signed URL stops working: the requested lifetime,
+    or the S3 X-Amz-Expires window if the URL carries a shorter one.
+    """
+    expires_at = requested_at + minutes * 60
+    query = parse_qs(urlsplit(url).query)
+    amz_expires = (query.get("X-Amz-Expires") or [None])[0]
+    if amz_expires and amz_expires.isdigit():
+        expires_at = min(expires_at, requested_at + int(amz_expires))
+    return expires_at
+
+
+class SignedURLCache:
+    """
+    Signed S3 download URLs keyed by project and storage URN, kept in the
+    token_store config space so every worker shares them. Each entry expires
+    `margin` seconds before its URL does, so a cached URL is always still
+    usable. Entries are shared by every session of a project; callers must
+    confirm the session can access the project before serving one.
+    """
+
+    def __init__(self, margin: int = SIGNED_URL_MARGIN, enabled: bool = SIGNED_URL_CACHE_ENABLED):
+        self.margin = margin
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stores": 0}
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    def _usable(self, data: Optional[str]) -> Optional[str]:
+        entry = json.loads(data) if data else None
+        if not entry or entry["expires_at"] - self.margin <= time.time():
+            self._count("misses")
+            return None
+        self._count("hits")
+        return entry["url"]
+
+    def get(self, project_id: str, storage_urn: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        try:
+            data = token_store.get_config(_key(project_id, storage_urn))
+        except Exception as e:
+            logger.debug(f"[SignedURLCache] Redis get failed: {e}")
+            data = None
+        return self._usable(data)
+
+    async def get_async(self, project_id: str, storage_urn: str) -> Optional[str]:
+        "get for coroutines, reading Redis in a thread"
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self.get, project_id, storage_urn)
+
+    def get_many(self, project_id: str, storage_urns: Iterable[str]) -> Dict[str, str]:
+        "Return {urn: url} for the URNs with a usable cached URL, read with one MGET"
+        if not self.enabled:
+            return {}
+        urns = list(storage_urns)
+        try:
+            stored = token_store.get_configs(_key(project_id, urn) for urn in urns)
+        except Exception as e:
+            logger.debug(f"[SignedURLCache] Redis get failed: {e}")
+            stored = {}
+        urls = {}
+        for urn in urns:
+            url = self._usable(stored.get(_key(project_id, urn)))
+            if url:
+                urls[urn] = url
+        return urls
+
+    def _ttl(self, expires_at: float) -> int:
+        return int(expires_at - self.margin - time.time())
+
+    def set(self, project_id: str, storage_urn: str, url: str, expires_at: float):
+        self.set_many(project_id, {storage_urn: (url, expires_at)})
+
+    async def set_async(self, project_id: str, storage_urn: str, url: str, expires_at: float):
+        if self.enabled:
+            await asyncio.to_thread(self.set, project_id, storage_urn, url, expires_at)
+
+    def set_many(self, project_id: str, entries: Dict[str, Tuple[str, float]]):
+        "Cache {urn: (url, expires_at)} in one pipelined write"
+        if not self.enabled:
+            return
+        values, ttls = {}, {}
+        for urn, (url, expires_at) in entries.items():
+            ttl = self._ttl(expires_at)
+            if ttl > 0:
+                values[_key(project_id, urn)] = json.dumps({"url": url, "expires_at": expires_at})
+                ttls[_key(project_id, urn)] = ttl
+        if not values:
+            return
+        try:
+            token_store.set_configs(values, ttls)
+            self._count("stores", len(values))
+        except Exception as e:
+            logger.debug(f"[SignedURLCache] Redis set failed: {e}")
+
+    def invalidate(self, project_id: str, storage_urn: str):
+        try:
+            token_store.clear_config(_key(project_id, storage_urn))
+        except Exception as e:
+            logger.debug(f"[SignedURLCache] Redis delete failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+signed_url_cache = SignedURLCache()
+registry.collected(
+    "signed_url_cache_events_total", "Signed download URL cache hits, misses and stores",
+    lambda: dict(signed_url_cache.counters), ["event"], kind="counter"
+)
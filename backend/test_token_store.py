@@ -0,0 +1,82 @@
+import json
+import os
+import time
+
+import fakeredis
+import pytest
+
+# Keep the embedded store out of the home directory when REDIS_URL is unset
+os.environ.setdefault("LOCAL_STORE_PATH", ":memory:")
+
+from backend import token_store
+
+
+def _payload(access_token: str) -> str:
+    return json.dumps({"access_token": access_token, "refresh_token": "r", "expires_at": int(time.time()) + 3600})
+
+
+def _wait(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    cache = token_store.TokenCache(ttl=60, enabled=True)
+    monkeypatch.setattr(token_store, "redis_client", client)
+    monkeypatch.setattr(token_store, "token_cache", cache)
+    cache._ensure_listener()
+    assert _wait(cache._listening.is_set)
+    return client
+
+
+def test_another_workers_write_drops_the_cached_tokens(redis):
+    redis.set("session:s1", _payload("old"))
+    assert token_store.get_tokens("s1")["access_token"] == "old"
+    assert token_store.token_cache.get("s1")[0]
+
+    # Another worker stores new tokens and announces it
+    redis.set("session:s1", _payload("new"))
+    redis.publish(token_store.INVALIDATE_CHANNEL, "other-worker:s1")
+
+    assert _wait(lambda: not token_store.token_cache.get("s1")[0])
+    assert token_store.get_tokens("s1")["access_token"] == "new"
+
+
+def test_invalidation_during_the_redis_read_is_not_undone(redis, monkeypatch):
+    redis.set("session:s1", _payload("old"))
+    read = redis.get
+
+    def get_then_invalidate(key):
+        data = read(key)
+        # The new tokens land and their invalidation arrives before the reader caches `data`
+        redis.set("session:s1", _payload("new"))
+        token_store.token_cache.drop("s1")
+        return data
+
+    monkeypatch.setattr(redis, "get", get_then_invalidate)
+    assert token_store.get_tokens("s1")["access_token"] == "old"
+    assert not token_store.token_cache.get("s1")[0]
+
+    monkeypatch.setattr(redis, "get", read)
+    assert token_store.get_tokens("s1")["access_token"] == "new"
+
+
+def test_get_session_skips_the_cache_after_an_invalidation(redis, monkeypatch):
+    redis.set("session:s1", _payload("old"))
+    read = redis.mget
+
+    def mget_then_invalidate(keys):
+        values = read(keys)
+        token_store.token_cache.drop("s1")
+        return values
+
+    monkeypatch.setattr(redis, "mget", mget_then_invalidate)
+    payload, _ = token_store.get_session("s1")
+    assert payload["access_token"] == "old"
+    assert not token_store.token_cache.get("s1")[0]
@@ -1,34 +1,233 @@
+import contextlib
 import json
+import logging
+import os
+import threading
 import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, List, Tuple
+from backend.metrics import timed, token_cache_lookups, token_store_seconds
 from backend.redis_client import redis_client
 
+logger = logging.getLogger(__name__)
+
 SESSION_PREFIX = "session:"
 CONFIG_PREFIX = "config:"
+REFRESH_LOCK_PREFIX = "lock:refresh:"
+# Workers announce token writes here so the others drop their cached copy
+INVALIDATE_CHANNEL = "token_store:invalidate"
+TOKEN_CACHE_ENABLED = os.getenv("TOKEN_CACHE_ENABLED", "1") != "0"
+# Upper bound on how long a cached payload is trusted, in case a message is missed
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", 60))
+# Seconds the invalidation listener waits for a message per poll
+LISTEN_POLL = 1.0
 
 def _config_key(key: str) -> str:
     return f"{CONFIG_PREFIX}{key}"
 
+def _text(data) -> str | None:
+    if not data:
+        return None
+    if isinstance(data, bytes):
+        return data.decode("utf-8")
+    return data
+
+@timed(token_store_seconds, "set_config")
 def set_config(key: str, value: str, ttl: int | None = None):
     if ttl:
         redis_client.setex(_config_key(key), ttl, value)
     else:
         redis_client.set(_config_key(key), value)
+    _scope_update(key, value)
 
+@timed(token_store_seconds, "get_config")
 def get_config(key: str) -> str | None:
-    data = redis_client.get(_config_key(key))
-    if not data:
-        return None
-    if isinstance(data, bytes):
-        return data.decode("utf-8")
-    return data
+    found, value = _scope_config(key)
+    if found:
+        return value
+    return _text(redis_client.get(_config_key(key)))
 
+@timed(token_store_seconds, "clear_config")
 def clear_config(key: str):
     redis_client.delete(_config_key(key))
+    _scope_update(key, None)
+
+@timed(token_store_seconds, "get_configs")
+def get_configs(keys: Iterable[str]) -> Dict[str, str | None]:
+    "Several config values with one MGET; missing keys map to None"
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+    scoped = {}
+    for key in keys:
+        found, value = _scope_config(key)
+        if not found:
+            break
+        scoped[key] = value
+    else:
+        return scoped
+    return _mget_configs(keys)
+
+def _mget_configs(keys: List[str]) -> Dict[str, str | None]:
+    values = redis_client.mget([_config_key(key) for key in keys])
+    return {key: _text(value) for key, value in zip(keys, values)}
+
+@timed(token_store_seconds, "set_configs")
+def set_configs(values: Dict[str, str], ttl: int | Dict[str, int] | None = None):
+    """
+    Write several config values in one pipelined round-trip. `ttl` applies
+    to every key, or is a {key: ttl} mapping for per-key expiry.
+    """
+    if not values:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    for key, value in values.items():
+        seconds = ttl.get(key) if isinstance(ttl, dict) else ttl
+        if seconds:
+            pipe.setex(_config_key(key), seconds, value)
+        else:
+            pipe.set(_config_key(key), value)
+    pipe.execute()
+    for key, value in values.items():
+        _scope_update(key, value)
 
 def _key(session_id: str) -> str:
     return f"{SESSION_PREFIX}{session_id}"
 
 
+class TokenCache:
+    """
+    Decoded token payloads per session, kept in process so auth checks do
+    not hit Redis. Writes are published on INVALIDATE_CHANNEL and a listener
+    thread drops the entry in every other worker. Entries are only served
+    while the listener is subscribed, and for at most `ttl` seconds.
+
+    Every drop or clear bumps a generation counter. A reader takes
+    generation() before it goes to Redis and hands it to put(), which skips
+    the write if an invalidation arrived in between, so a payload read just
+    before a token change is never cached after it.
+    """
+
+    def __init__(self, ttl: float = TOKEN_CACHE_TTL, enabled: bool = TOKEN_CACHE_ENABLED):
+        self.ttl = ttl
+        self.enabled = enabled
+        self.worker_id = uuid.uuid4().hex
+        self._entries: dict = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._listening = threading.Event()
+        self._listener: threading.Thread | None = None
+
+    def _ensure_listener(self):
+        if self._listener is not None and self._listener.is_alive():
+            return
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="token-cache-listener", daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            pubsub = None
+            try:
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATE_CHANNEL)
+                self._listening.set()
+                while True:
+                    # Poll rather than listen(): a quiet channel must not trip the socket timeout
+                    message = pubsub.get_message(timeout=LISTEN_POLL)
+                    if not message or message.get("type") != "message":
+                        continue
+                    data = message["data"]
+                    if isinstance(data, bytes):
+                        data = data.decode("utf-8")
+                    worker_id, _, session_id = data.partition(":")
+                    if worker_id != self.worker_id:
+                        self.drop(session_id)
+            except Exception as e:
+                logger.warning(f"[TokenCache] Invalidation listener failed, retrying: {e}")
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception as e:
+                        logger.debug(f"[TokenCache] Could not close listener connection: {e}")
+            # Messages may have been missed while disconnected
+            self._listening.clear()
+            self.clear()
+            time.sleep(1)
+
+    def get(self, session_id: str):
+        "Return (hit, payload); payload may be None for a cached logged-out session"
+        if not self.enabled:
+            return False, None
+        self._ensure_listener()
+        if not self._listening.is_set():
+            return False, None
+        with self._lock:
+            entry = self._entries.get(session_id)
+        if entry is None or entry[0] < time.monotonic():
+            return False, None
+        return True, entry[1]
+
+    def generation(self) -> int:
+        "Take before reading Redis and pass to put(), so an invalidation in between is not undone"
+        with self._lock:
+            return self._generation
+
+    def put(self, session_id: str, payload: dict | None, generation: int | None = None):
+        if self.enabled and self._listening.is_set():
+            with self._lock:
+                if generation is not None and generation != self._generation:
+                    return
+                self._entries[session_id] = (time.monotonic() + self.ttl, payload)
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(session_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def publish(self, session_id: str):
+        try:
+            redis_client.publish(INVALIDATE_CHANNEL, f"{self.worker_id}:{session_id}")
+        except Exception as e:
+            logger.warning(f"[TokenCache] Could not publish invalidation: {e}")
+
+    def publish_with(self, pipe, session_id: str):
+        "Queue the invalidation on a pipeline, after the write it announces"
+        pipe.publish(INVALIDATE_CHANNEL, f"{self.worker_id}:{session_id}")
+
+
+token_cache = TokenCache()
+
+
+def _write_tokens(session_id: str, data: str | None):
+    "Store (or, for None, delete) a session's tokens and publish the invalidation in one round-trip"
+    pipe = redis_client.pipeline(transaction=False)
+    if data is None:
+        pipe.delete(_key(session_id))
+    else:
+        pipe.set(_key(session_id), data)
+    token_cache.publish_with(pipe, session_id)
+    written, published = pipe.execute(raise_on_error=False)
+    if isinstance(written, Exception):
+        raise written
+    if isinstance(published, Exception):
+        logger.warning(f"[TokenCache] Could not publish invalidation: {published}")
+
+
+def _decode_tokens(data) -> dict | None:
+    data = _text(data)
+    return json.loads(data) if data else None
+
+
+@timed(token_store_seconds, "set_tokens")
 def set_tokens(session_id: str, tokens: dict):
     expires_in = tokens.get("expires_in", 3600)
     payload = {
@@ -38,20 +237,114 @@ def set_tokens(session_id: str, tokens: dict):
         "user_id": tokens.get("user_id"),
     }
 
-    redis_client.set(
-        _key(session_id),
-        json.dumps(payload)
-    )
+    _write_tokens(session_id, json.dumps(payload))
+    token_cache.put(session_id, payload)
+    _scope_forget_tokens(session_id)
 
 
-def get_tokens(session_id: str) -> dict | None:
-    data = redis_client.get(_key(session_id))
-    if not data:
-        return None
-    if isinstance(data, bytes):
-        data = data.decode("utf-8")
-    return json.loads(data)
+@timed(token_store_seconds, "get_tokens")
+def get_tokens(session_id: str, fresh: bool = False) -> dict | None:
+    "Stored tokens for a session, from the in-process cache unless `fresh`"
+    if not fresh:
+        hit, payload = token_cache.get(session_id)
+        token_cache_lookups.inc("hit" if hit else "miss")
+        if hit:
+            return dict(payload) if payload else None
+        found, payload = _scope_tokens(session_id)
+        if found:
+            return dict(payload) if payload else None
+    generation = token_cache.generation()
+    payload = _decode_tokens(redis_client.get(_key(session_id)))
+    token_cache.put(session_id, payload, generation)
+    return dict(payload) if payload else None
+
+
+@timed(token_store_seconds, "get_session")
+def get_session(session_id: str, config_keys: Iterable[str] = ()) -> Tuple[dict | None, Dict[str, str | None]]:
+    "A session's tokens and the given config values with one MGET"
+    keys = list(dict.fromkeys(config_keys))
+    generation = token_cache.generation()
+    values = redis_client.mget([_key(session_id)] + [_config_key(key) for key in keys])
+    payload = _decode_tokens(values[0])
+    token_cache.put(session_id, payload, generation)
+    return payload, {key: _text(value) for key, value in zip(keys, values[1:])}
 
 
+@timed(token_store_seconds, "clear_tokens")
 def clear_tokens(session_id: str):
-    redis_client.delete(_key(session_id))
\ No newline at end of file
+    _write_tokens(session_id, None)
+    token_cache.drop(session_id)
+    _scope_forget_tokens(session_id)
+
+
+class _Prefetch:
+    """
+    The token_store reads one request is expected to make. The first
+    get_tokens / get_config inside the scope that needs Redis fetches the
+    session's tokens (unless the token cache has them) and every listed
+    config key with one MGET; later reads are answered from that result.
+    """
+
+    def __init__(self, session_id: str, config_keys: Iterable[str]):
+        self.session_id = session_id
+        self.config_keys = list(dict.fromkeys(config_keys))
+        self.configs: Dict[str, str | None] | None = None
+        # (loaded, payload) for the session's tokens
+        self.tokens: Tuple[bool, dict | None] = (False, None)
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self.configs is not None:
+                return
+            if token_cache.get(self.session_id)[0]:
+                self.configs = _mget_configs(self.config_keys) if self.config_keys else {}
+                return
+            payload, self.configs = get_session(self.session_id, self.config_keys)
+            self.tokens = (True, payload)
+
+
+_prefetch: ContextVar[_Prefetch | None] = ContextVar("token_store_prefetch", default=None)
+
+
+@contextlib.contextmanager
+def prefetch(session_id: str, config_keys: Iterable[str] = ()) -> Iterator[_Prefetch]:
+    "Answer this context's reads of the session's tokens and `config_keys` with one Redis round-trip"
+    scope = _Prefetch(session_id, config_keys)
+    token = _prefetch.set(scope)
+    try:
+        yield scope
+    finally:
+        _prefetch.reset(token)
+
+
+def _scope_config(key: str) -> Tuple[bool, str | None]:
+    scope = _prefetch.get()
+    if scope is None or key not in scope.config_keys:
+        return False, None
+    scope.load()
+    return True, scope.configs.get(key)
+
+
+def _scope_tokens(session_id: str) -> Tuple[bool, dict | None]:
+    scope = _prefetch.get()
+    if scope is None or scope.session_id != session_id:
+        return False, None
+    scope.load()
+    return scope.tokens
+
+
+def _scope_update(key: str, value: str | None):
+    scope = _prefetch.get()
+    if scope is not None and scope.configs is not None and key in scope.config_keys:
+        scope.configs[key] = value
+
+
+def _scope_forget_tokens(session_id: str):
+    scope = _prefetch.get()
+    if scope is not None and scope.session_id == session_id:
+        scope.tokens = (False, None)
+
+def refresh_lock(session_id: str, timeout: float = 30):
+    "Redis lock held while a session's tokens are refreshed, shared by all workers"
+    return redis_client.lock(f"{REFRESH_LOCK_PREFIX}{session_id}", timeout=timeout)
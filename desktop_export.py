@@ -0,0 +1,43 @@
+# desktop_export.py
+# The export bridge shared by app_launcher.py and dev_launcher.py
+import requests
+import webview
+
+BACKEND_EXPORT_URL = "http://localhost:8000/api/rfis/export"
+
+
+def export_rfis(window, body, filename, session_id=None, directory=''):
+    """
+    Stream /api/rfis/export straight into a file picked in a native dialog,
+    so large exports never cross the JS bridge as one string. The body is the
+    one ExportButton sends, "columns" and "userMap" included, so the file
+    matches the table.
+    """
+    try:
+        mode = webview.FileDialog.SAVE
+    except AttributeError:
+        mode = webview.SAVE_DIALOG
+
+    fmt = "xlsx" if filename.lower().endswith(".xlsx") else "csv"
+    file_path = window.create_file_dialog(
+        mode,
+        directory=directory,
+        save_filename=filename,
+        file_types=('Excel Files (*.xlsx)' if fmt == "xlsx" else 'CSV Files (*.csv)', 'All files (*.*)')
+    )
+    if isinstance(file_path, (tuple, list)):
+        file_path = file_path[0] if len(file_path) > 0 else None
+    if not file_path:
+        return False
+
+    headers = {"X-Session-Id": session_id} if session_id else {}
+    try:
+        with requests.post(BACKEND_EXPORT_URL, json={**(body or {}), "format": fmt}, headers=headers, stream=True, timeout=(5, 300)) as r:
+            r.raise_for_status()
+            with open(file_path, 'wb') as f:
+                for chunk in r.iter_content(chunk_size=1024 * 1024):
+                    f.write(chunk)
+        return True
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
@@ -2,6 +2,7 @@
 import subprocess
 import sys
 import webview
+import desktop_export
 import threading
 import os
 import time
@@ -52,6 +53,9 @@ class JSApi:
                 return False
         return False
 
+    def export_rfis(self, body, filename, session_id=None):
+        return desktop_export.export_rfis(webview.windows[0], body, filename, session_id)
+
 def start_backend():
     subprocess.Popen(
         [sys.executable, "-m", "backend.main"],
@@ -263,7 +263,7 @@ export default function MainPage({
                   <Button variant="outline" onClick={handleSearch} className="shadow-sm">
                     Refresh
                   </Button>
-                  <ExportButton data={results} fields={tableFields} gridApi={gridApi} userMap={userMap} />
+                  <ExportButton data={results} fields={tableFields} filters={filters} gridApi={gridApi} userMap={userMap} />
                 </div>
               </CardHeader>
 